@@ -0,0 +1,249 @@
+"""
+投手ごとの集計表（分析タブに出す数字の元）
+- 1球保存するたびに、その1球分だけ足し込む（投球数が増えても更新時間は同じ）
+- 分析タブは生データを読まずにこの集計表を読む
+- CSV が外から書き換えられた（GitHub から取得した等）場合は、生データから作り直す
+  （集計したときの CSV のサイズと更新時刻を覚えておき、どちらかが違えば書き換えられたとみなす）
+
+集計表は data/aggregates/<投手名>.json に置く。
+作り直し: python aggregates.py rebuild [--data-dir data]
+整合性チェック: python aggregates.py check [--data-dir data]
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from pitch_data import load_pitcher_data
+from pitch_log import header_size, locked
+from timing import stage
+
+AGGREGATE_DIR = "aggregates"  # data/ の下に置く
+VERSION = 3  # 3: 更新時刻（source_mtime_ns）も記録する
+
+
+def aggregate_path(csv_path):
+    """data/投手.csv → data/aggregates/投手.json"""
+    data_dir, name = os.path.split(csv_path)
+    return os.path.join(data_dir, AGGREGATE_DIR, os.path.splitext(name)[0] + ".json")
+
+
+def empty_aggregates():
+    """空の集計表（値はすべて正規の表記。英語名への変換は表示するときに行う）"""
+    return {
+        "version": VERSION,
+        "source_size": 0,    # 集計に含めた CSV のバイト数
+        "source_mtime_ns": None,  # そのときの CSV の更新時刻（同じサイズのまま書き換えられたかの確認用）
+        "rows": 0,
+        "pitch_type": {},    # 球種 → 投球数
+        "count_pitch": {},   # カウント → 球種 → 投球数
+        "zone": {},          # 打者左右 → コース → 投球数
+        "direction": {},     # 打者左右 → 打球方向（複数選択は分割） → 件数
+    }
+
+
+def _nested_counts(series):
+    """2段の MultiIndex を持つ件数 Series を {外側: {内側: 件数}} にする"""
+    result = {}
+    for (outer, inner), n in series.items():
+        if n:
+            result.setdefault(str(outer), {})[str(inner)] = int(n)
+    return result
+
+
+def aggregate_frame(df):
+    """投球データの DataFrame（値は正規の表記）から集計表を作る"""
+    with stage("aggregates.groupby"):
+        agg = empty_aggregates()
+        agg["rows"] = len(df)
+        if df.empty:
+            return agg
+        if "球種" in df.columns:
+            agg["pitch_type"] = {str(k): int(n) for k, n in df["球種"].value_counts().items() if n}
+        if "カウント" in df.columns and "球種" in df.columns:
+            agg["count_pitch"] = _nested_counts(df.groupby(["カウント", "球種"], observed=True).size())
+        if "打者左右" in df.columns and "コース" in df.columns:
+            agg["zone"] = _nested_counts(df.groupby(["打者左右", "コース"], observed=True).size())
+        if "打者左右" in df.columns and "打球方向" in df.columns:
+            directions = pd.DataFrame({
+                "打者左右": df["打者左右"].astype(object),
+                "打球方向": df["打球方向"].astype(object).str.split(","),
+            }).explode("打球方向")
+            agg["direction"] = _nested_counts(directions.groupby(["打者左右", "打球方向"]).size())
+        return agg
+
+
+def _weighted_counts(df, keys):
+    """件数列つきの DataFrame を keys ごとに合計する（keys に欠損がある行は数えない）"""
+    return df.groupby(keys)["件数"].sum()
+
+
+def aggregate_grouped(rows, by_pitch, by_zone, by_direction):
+    """
+    GROUP BY 済みの件数から集計表を作る（SQLite で集計した結果用）
+    - by_pitch: 球種・カウント・件数 / by_zone: 打者左右・コース・件数 / by_direction: 打者左右・打球方向・件数
+    - 分割のしかたは aggregate_frame と同じ（値の組み合わせの数だけ処理すればよい）
+    """
+    agg = empty_aggregates()
+    agg["rows"] = int(rows)
+    if not rows:
+        return agg
+    pitch_types = _weighted_counts(by_pitch, "球種").sort_values(ascending=False)
+    agg["pitch_type"] = {str(k): int(n) for k, n in pitch_types.items() if n}
+    agg["count_pitch"] = _nested_counts(_weighted_counts(by_pitch, ["カウント", "球種"]))
+    agg["zone"] = _nested_counts(_weighted_counts(by_zone, ["打者左右", "コース"]))
+    directions = by_direction.assign(打球方向=by_direction["打球方向"].astype(object).str.split(",")).explode("打球方向")
+    agg["direction"] = _nested_counts(_weighted_counts(directions, ["打者左右", "打球方向"]))
+    return agg
+
+
+def merge_aggregates(total, part):
+    """part の件数を total に足し込む（total を書き換える）"""
+    total["rows"] += part["rows"]
+    for key, n in part["pitch_type"].items():
+        total["pitch_type"][key] = total["pitch_type"].get(key, 0) + n
+    for name in ("count_pitch", "zone", "direction"):
+        for outer, inner_counts in part[name].items():
+            target = total[name].setdefault(outer, {})
+            for inner, n in inner_counts.items():
+                target[inner] = target.get(inner, 0) + n
+    return total
+
+
+def aggregate_pitch(data):
+    """入力フォームの1球分（dict、正規の表記）を集計表にする"""
+    df = pd.DataFrame([data]).replace("", np.nan)
+    return aggregate_frame(df)
+
+
+def save_aggregates(csv_path, agg):
+    path = aggregate_path(csv_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(agg, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read_stored(csv_path):
+    try:
+        with open(aggregate_path(csv_path), encoding="utf-8") as f:
+            agg = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return agg if agg.get("version") == VERSION else None
+
+
+def _source(csv_path):
+    """CSV の (サイズ, 更新時刻)"""
+    st = os.stat(csv_path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _is_current(agg, csv_path):
+    """集計表が今の CSV から作られたものか（サイズも更新時刻も同じ）"""
+    return agg is not None and (agg["source_size"], agg["source_mtime_ns"]) == _source(csv_path)
+
+
+def _rebuild(csv_path):
+    size, mtime_ns = _source(csv_path)
+    agg = aggregate_frame(load_pitcher_data(csv_path))
+    agg["source_size"], agg["source_mtime_ns"] = size, mtime_ns
+    save_aggregates(csv_path, agg)
+    return agg
+
+
+def rebuild_aggregates(csv_path):
+    """
+    生データ（CSV）から集計表を作り直して保存する
+    - 作り直し中に1球追記されて二重に数えないよう、CSV をロックする
+    """
+    with open(csv_path, "rb") as f:
+        with locked(f):
+            return _rebuild(csv_path)
+
+
+def record_pitch(csv_path, data, start, end, mtime_ns=None):
+    """
+    1球保存した直後に集計表へ足し込む（pitch_log.append_pitch の after_write から呼ぶ）
+    - 集計表が追記前の CSV と一致していなければ、作り直す
+    """
+    return record_part(csv_path, aggregate_pitch(data), start, end, mtime_ns)
+
+
+def record_part(csv_path, part, start, end, mtime_ns=None):
+    """
+    追記した分の集計表 part を足し込む（一括取り込みでは aggregate_frame の結果を渡す）
+    - start / mtime_ns: 追記する前の CSV のサイズ・更新時刻。集計表の記録と違えば作り直す
+    """
+    agg = _read_stored(csv_path)
+    if agg is None and start == header_size(csv_path):
+        agg = empty_aggregates()  # 新しいファイル（追記前はヘッダーだけ）なら空の集計表から始める
+        agg["source_size"], agg["source_mtime_ns"] = start, mtime_ns
+    if agg is None or (agg["source_size"], agg["source_mtime_ns"]) != (start, mtime_ns):
+        return _rebuild(csv_path)  # ロックは追記する側が持っている
+    merge_aggregates(agg, part)
+    agg["source_size"], agg["source_mtime_ns"] = _source(csv_path)
+    save_aggregates(csv_path, agg)
+    return agg
+
+
+def needs_rebuild(csv_path):
+    """集計表がない・古い場合 True（作り直しは重いので、呼び出し側で並列化の判断に使う）"""
+    return not _is_current(_read_stored(csv_path), csv_path)
+
+
+def load_aggregates(csv_path):
+    """
+    分析用に集計表を読む
+    - CSV のサイズか更新時刻が集計時と違えば（外から書き換えられた）作り直す
+    """
+    agg = _read_stored(csv_path)
+    if not _is_current(agg, csv_path):
+        agg = rebuild_aggregates(csv_path)
+    return agg
+
+
+def check_aggregates(csv_path):
+    """保存されている集計表と、生データから作り直した集計表を比べる（差分の説明のリストを返す）"""
+    stored = _read_stored(csv_path)
+    if stored is None:
+        return ["集計表がありません"]
+    fresh = aggregate_frame(load_pitcher_data(csv_path))
+    problems = []
+    if not _is_current(stored, csv_path):
+        problems.append(f"source {stored['source_size']}, {stored['source_mtime_ns']} != {_source(csv_path)}")
+    for key in ("rows", "pitch_type", "count_pitch", "zone", "direction"):
+        if stored[key] != fresh[key]:
+            problems.append(f"{key} が一致しません")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="投手ごとの集計表の管理")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in [("rebuild", "生データから集計表を作り直す"), ("check", "集計表と生データを比べる")]:
+        p = sub.add_parser(command, help=help_text)
+        p.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    failed = False
+    for name in sorted(os.listdir(args.data_dir)):
+        if not name.endswith(".csv"):
+            continue
+        csv_path = os.path.join(args.data_dir, name)
+        if args.command == "rebuild":
+            agg = rebuild_aggregates(csv_path)
+            print(f"{name}: {agg['rows']} rows")
+        else:
+            problems = check_aggregates(csv_path)
+            print(f"{name}: {'OK' if not problems else ', '.join(problems)}")
+            failed = failed or bool(problems)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,125 +1,121 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-import os
-import matplotlib.image as mpimg
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import ImageReader
 from io import BytesIO
-
-plt.rcParams['font.family'] = 'DejaVu Sans'  # Matplotlib 標準英語フォント
+from datetime import datetime, timedelta
+from aggregates import aggregate_frame
+from storage import get_storage
+from vocabulary import pitch_type_label, direction_label
+import time_index
+from timing import stage
+from figure_cache import render_cached, fig_to_png
+from field_chart import FIELD_IMAGE, has_field_image, draw_direction_png
+
+# matplotlib / seaborn / reportlab は重いので、実際に図や PDF を作るときに読み込む
+_plt = None
+
+
+def _pyplot():
+    """matplotlib.pyplot を初回だけ読み込んで設定する"""
+    global _plt
+    if _plt is None:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        plt.rcParams['font.family'] = 'DejaVu Sans'  # Matplotlib 標準英語フォント
+        _plt = plt
+    return _plt
 
 
 DATA_DIR = "data"
 
-# PDF作成関数
-def create_pdf(figures, title="投手分析レポート"):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    # タイトル
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(100, height - 50, title)
-    c.setFont("Helvetica", 10)
-
-    y = height - 100
-    for fig in figures:
-        img_buffer = BytesIO()
-        fig.savefig(img_buffer, format="png", dpi=150, bbox_inches="tight")
-        img_buffer.seek(0)
-        # PDFに画像を貼る（BytesIO -> ImageReader を使う）
-        image = ImageReader(img_buffer)
-        c.drawImage(image, 70, y - 150, width=400, height=250)
-        y -= 300
-        if y < 100:
-            c.showPage()
-            y = height - 100
-    c.save()
-    buffer.seek(0)
-    return buffer
-
-    
+# --- ゾーン（投手目線の3×3） ---
+zones = ["内角高め","真ん中高め","外角高め",
+         "内角真ん中","真ん中","外角真ん中",
+         "内角低め","真ん中低め","外角低め"]
+zone_map = {
+    "内角高め": (2,2), "真ん中高め": (2,1), "外角高め":(2,0),
+    "内角真ん中":(1,2), "真ん中":(1,1), "外角真ん中":(1,0),
+    "内角低め":(0,2), "真ん中低め":(0,1), "外角低め":(0,0)
+}
 
-def show_analysis(DATA_DIR):
+# --- 打球方向（英語名は vocabulary.DIRECTION_LABELS） ---
+outfield = ["Left","Left Center","Center","Right Center","Right"]
+infield = ["Third Base","Shortstop","Second Base","First Base"]
+all_directions = outfield + infield
 
-    pitcher_files = [f for f in os.listdir(DATA_DIR) if f.endswith(".csv")]
-    if not pitcher_files:
-        st.warning("No data found. Please input pitcher data first.")
-        return
-    
-     # --- PDF用にグラフを集めるリスト ---
-    figures = []
+# 打球位置
+positions = {
+    "Left":(0.2,0.75),"Left Center":(0.35,0.85),"Center":(0.5,0.9),
+    "Right Center":(0.65,0.85),"Right":(0.8,0.75),
+    "Third Base":(0.28,0.48),"Shortstop":(0.42,0.54),"Second Base":(0.58,0.54),"First Base":(0.72,0.48)
+}
 
-    
-    # 1回だけ投手選択
-    selected_file = st.selectbox("Select Pitcher", pitcher_files)
-    df = pd.read_csv(os.path.join(DATA_DIR, selected_file))
-    if df.empty:
-        st.info("No data available for this pitcher yet.")
-        return
 
-   # --- Pitch type distribution ---
-    st.write("### Pitch Type Distribution")
+def create_zone_matrix(zone_series, batter_side="右"):
+    mat = np.zeros((3,3))
+    for zone, count in zone_series.items():
+        if zone in zone_map:
+            i,j = zone_map[zone]
+            if batter_side=="左":
+                j = 2-j
+            mat[i,j] = count
+    return mat
+
+
+# ----------------------------
+# 集計表（aggregates.py）から図の元になる小さな表を作る
+# ----------------------------
+def count_pitch_types(agg):
+    """円グラフ用: 球種（英語名）ごとの投球数"""
+    counts = pd.Series(agg["pitch_type"], dtype="int64")
+    counts = counts.groupby(counts.index.map(pitch_type_label), sort=False).sum()
+    return counts.sort_values(ascending=False, kind="stable")
+
+
+def count_pitch_percentages(agg):
+    """カウント別の球種（英語名）割合（%）"""
+    count_pitch = pd.DataFrame(agg["count_pitch"]).fillna(0)
+    count_pitch = count_pitch.groupby(count_pitch.index.map(pitch_type_label)).sum().T.sort_index().sort_index(axis=1)
+    count_pitch.index.name = "カウント"
+    count_pitch.columns.name = "球種"
+    count_pitch_percent = (count_pitch.T / count_pitch.sum(axis=1)).T * 100
+    return count_pitch_percent.round(1)
 
-# データの値（カタカナ）を英語に変換
-    df["pitch_type"] = df["球種"].replace({
-    "直球": "Fastball",
-    "スライダー": "Slider",
-    "チェンジアップ": "Changeup",
-    "カーブ": "Curveball",
-    "ツーシーム": "Two-Seam",
-    "シンカー": "Sinker",
-    "ストレート": "Fastball",
-    "シュート": "Two-Seam",
-    "カットボール": "cut ball",
-})
 
-# 変換後の 'pitch_type' 列のデータを使ってカウント
-    pitch_counts = df["pitch_type"].value_counts()
+def zone_counts(agg, batter_side):
+    """打者の左右ごとのコース別投球数（zones の順）"""
+    return pd.Series(agg["zone"].get(batter_side, {}), dtype="int64").reindex(zones, fill_value=0)
+
+
+def direction_percentages(agg, batter_side):
+    """打球方向ごとの割合（%）"""
+    counts = pd.Series(agg["direction"].get(batter_side, {}), dtype="int64")
+    total = counts.sum()
+    if total == 0:
+        return pd.Series(0.0, index=all_directions)
+    direction_counts = counts.groupby(counts.index.map(direction_label)).sum()
+    direction_counts = direction_counts.reindex(all_directions, fill_value=0)
+    return (direction_counts / total * 100).round(1)
 
+
+# ----------------------------
+# 描画（matplotlib の Figure を返す）
+# ----------------------------
+def draw_pitch_pie(pitch_counts):
+    plt = _pyplot()
     fig, ax = plt.subplots()
     ax.pie(pitch_counts, labels=pitch_counts.index, autopct="%1.1f%%", startangle=70)
     ax.axis("equal")
-    st.pyplot(fig)
-    figures.append(fig)   # PDFに入れる
+    return fig
 
-    # --- Count-based pitch percentage ---
-    st.title("🎯 Count-based Pitch Percentage")
-    if "カウント" not in df.columns or "球種" not in df.columns:
-        st.warning("CSV must contain 'カウント' and '球種' columns.")
-        return
 
-    df["カウント"] = df["カウント"].astype(str).str.strip().str.replace("０","0").str.replace("１","1")\
-                    .str.replace("２","2").str.replace("３","3")
-    
-    pitch_type_map = {
-        "ストレート": "Fastball",
-        "フォーシーム": "Fastball",
-        "ツーシーム": "Two-Seam",
-        "シンカー": "Sinker",
-        "カットボール": "cut Ball",
-        "スライダー": "Slider",
-        "カーブ": "Curveball",
-        "フォーク": "Off-speed Pitch",
-        "チェンジアップ": "Changeup ",
-        "スプリット": "Off-speed Pitch",
-    }
-    df['球種'] = df['球種'].apply(lambda x: pitch_type_map.get(x, x))
-    count_pitch = df.groupby(["カウント", "球種"]).size().unstack(fill_value=0)
-    count_pitch_percent = (count_pitch.T / count_pitch.sum(axis=1)).T * 100
-    count_pitch_percent = count_pitch_percent.round(1)
-
-    st.subheader("📋 Table: Count-based Pitch %")
-    st.dataframe(count_pitch_percent.style.format("{:.1f}%"))
-
-    st.subheader("📊 Bar Chart: Count-based Pitch %")
+def draw_count_bar(count_pitch_percent):
+    plt = _pyplot()
+    import seaborn as sns
     df_bar = count_pitch_percent.reset_index().melt(id_vars="カウント", var_name="Pitch Type", value_name="Percentage")
-    plt.figure(figsize=(12,6))
-    ax = sns.barplot(data=df_bar, x="カウント", y="Percentage", hue="Pitch Type")
+    fig, ax = plt.subplots(figsize=(12,6))
+    sns.barplot(data=df_bar, x="カウント", y="Percentage", hue="Pitch Type", ax=ax)
     ax.set_title("Count-based Pitch Percentage")
     ax.set_xlabel("Count")
     ax.set_ylabel("Percentage (%)")
@@ -127,144 +123,247 @@ def show_analysis(DATA_DIR):
         for bar in container:
             height = bar.get_height()
             ax.text(bar.get_x() + bar.get_width()/2, height + 0.5, f'{height:.1f}%', ha='center')
-    plt.xticks(rotation=45)
-    plt.legend(title="Pitch Type", bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.tight_layout()
-    st.pyplot(plt.gcf())
-    figures.append(plt.gcf())   # PDFに入れる
+    ax.tick_params(axis="x", rotation=45)
+    ax.legend(title="Pitch Type", bbox_to_anchor=(1.05, 1), loc='upper left')
+    fig.tight_layout()
+    return fig
+
+
+def draw_zone_heatmap(mat, cmap, title):
+    plt = _pyplot()
+    import seaborn as sns
+    fig, ax = plt.subplots()
+    sns.heatmap(mat, annot=True, fmt=".0f", cmap=cmap, ax=ax)
+    ax.set_title(title)
+    ax.invert_yaxis()
+    return fig
+
+
+def draw_direction(direction_percents, title):
+    """球場画像の下地にラベルだけを書いた PNG を返す（matplotlib は使わない）"""
+    return draw_direction_png(direction_percents, positions, title)
+
+
+# ----------------------------
+# 描画済み PNG（集計データが同じならキャッシュから返す）
+# ----------------------------
+def render_pitch_pie(pitch_counts):
+    return render_cached("pitch_pie", pitch_counts, draw_pitch_pie)
+
+
+def render_count_bar(count_pitch_percent):
+    return render_cached("count_bar", count_pitch_percent, draw_count_bar)
+
+
+def render_zone_heatmap(mat, cmap, title):
+    return render_cached("zone_heatmap", mat, draw_zone_heatmap, cmap=cmap, title=title)
+
+
+def render_direction(direction_percents, title):
+    return render_cached("direction", direction_percents, draw_direction, title=title)
+
+
+# PDF作成関数
+def create_pdf(images, title="投手分析レポート"):
+    """
+    PDF を作る
+    - images: 描画済み PNG のバイト列（Figure を渡した場合はここで PNG にする）
+    """
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+
+    with stage("pdf.create_pdf"):
+        buffer = BytesIO()
+        c = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+
+        # タイトル
+        c.setFont("Helvetica-Bold", 16)
+        c.drawString(100, height - 50, title)
+        c.setFont("Helvetica", 10)
+
+        y = height - 100
+        for png in images:
+            if not isinstance(png, bytes):
+                png = fig_to_png(png)
+            # PDFに画像を貼る（BytesIO -> ImageReader を使う）
+            image = ImageReader(BytesIO(png))
+            c.drawImage(image, 70, y - 150, width=400, height=250)
+            y -= 300
+            if y < 100:
+                c.showPage()
+                y = height - 100
+        c.save()
+        buffer.seek(0)
+        return buffer
+
+
+def show_charts(agg):
+    """
+    集計表から分析の図・表をすべて表示する（投手別・チーム全体で共通）
+    戻り値: PDF 用の描画済み PNG のリスト
+    """
+     # --- PDF用に描画済みの図（PNG）を集めるリスト ---
+    figures = []
+
+   # --- Pitch type distribution ---
+    st.write("### Pitch Type Distribution")
+
+# 変換後の 'pitch_type' 列のデータを使ってカウント
+    png = render_pitch_pie(count_pitch_types(agg))
+    st.image(png, width="stretch")
+    figures.append(png)   # PDFに入れる
+
+    # --- Count-based pitch percentage ---
+    st.title("🎯 Count-based Pitch Percentage")
+    if not agg["count_pitch"]:
+        st.warning("CSV must contain 'カウント' and '球種' columns.")
+        return figures
+
+    count_pitch_percent = count_pitch_percentages(agg)
+
+    st.subheader("📋 Table: Count-based Pitch %")
+    st.dataframe(count_pitch_percent.style.format("{:.1f}%"))
+
+    st.subheader("📊 Bar Chart: Count-based Pitch %")
+    png = render_count_bar(count_pitch_percent)
+    st.image(png, width="stretch")
+    figures.append(png)   # PDFに入れる
     # --- Heatmap ---
     st.title("📊 Heatmap (Pitcher Perspective)")
-    if "打者左右" not in df.columns or "コース" not in df.columns:
+    if not agg["zone"]:
         st.error("CSV must contain '打者左右' and 'コース' columns.")
-        return
-
-    zones = ["内角高め","真ん中高め","外角高め",
-             "内角真ん中","真ん中","外角真ん中",
-             "内角低め","真ん中低め","外角低め"]
-    zone_map = {
-        "内角高め": (2,2), "真ん中高め": (2,1), "外角高め":(2,0),
-        "内角真ん中":(1,2), "真ん中":(1,1), "外角真ん中":(1,0),
-        "内角低め":(0,2), "真ん中低め":(0,1), "外角低め":(0,0)
-    }
-
-    def create_zone_matrix(zone_series, batter_side="右"):
-        mat = np.zeros((3,3))
-        for zone, count in zone_series.items():
-            if zone in zone_map:
-                i,j = zone_map[zone]
-                if batter_side=="左":
-                    j = 2-j
-                mat[i,j] = count
-        return mat
+        return figures
 
     col1, col2 = st.columns(2)
     with col1:
         st.subheader("Right-handed Batters")
-        df_right = df[df["打者左右"]=="右"]
-        counts_right = df_right["コース"].value_counts().reindex(zones, fill_value=0)
-        mat_right = create_zone_matrix(counts_right, batter_side="右")
-        fig_r, ax_r = plt.subplots()
-        sns.heatmap(mat_right, annot=True, fmt=".0f", cmap="Reds", ax=ax_r)
-        ax_r.set_title("Right-handed Batters")
-        ax_r.invert_yaxis()
-        st.pyplot(fig_r)
-        figures.append(fig_r)   # PDFに入れる
+        mat_right = create_zone_matrix(zone_counts(agg, "右"), batter_side="右")
+        png = render_zone_heatmap(mat_right, "Reds", "Right-handed Batters")
+        st.image(png, width="stretch")
+        figures.append(png)   # PDFに入れる
 
     with col2:
         st.subheader("Left-handed Batters")
-        df_left = df[df["打者左右"]=="左"]
-        counts_left = df_left["コース"].value_counts().reindex(zones, fill_value=0)
-        mat_left = create_zone_matrix(counts_left, batter_side="左")
-        fig_l, ax_l = plt.subplots()
-        sns.heatmap(mat_left, annot=True, fmt=".0f", cmap="Blues", ax=ax_l)
-        ax_l.set_title("Left-handed Batters")
-        ax_l.invert_yaxis()
-        st.pyplot(fig_l)
-        figures.append(fig_l)   # PDFに入れる
+        mat_left = create_zone_matrix(zone_counts(agg, "左"), batter_side="左")
+        png = render_zone_heatmap(mat_left, "Blues", "Left-handed Batters")
+        st.image(png, width="stretch")
+        figures.append(png)   # PDFに入れる
     # --- Batted Ball Direction Analysis ---
     st.title("🏟️ Batted Ball Direction Analysis")
 
-    if "打球方向" not in df.columns or "打者左右" not in df.columns:
+    if not agg["direction"]:
      st.error("This CSV does not contain '打球方向' or '打者左右' columns.")
-     return
-
-# 打球方向を分割して展開
-    df_exploded = df.assign(打球方向=df["打球方向"].str.split(",")).explode("打球方向")
-
-# 打球方向の値を変換
-    df_exploded["打球方向"] = df_exploded["打球方向"].replace({
-    "三塁":"Third Base","遊撃":"Shortstop","二塁":"Second Base","一塁":"First Base",
-    "3B":"Third Base","SS":"Shortstop","2B":"Second Base","1B":"First Base",
-    "サード":"Third Base", "ショート":"Shortstop", "セカンド":"Second Base", "ファースト":"First Base",
-    "レフト":"Left","左中間":"Left Center","センター":"Center","右中間":"Right Center","ライト":"Right"
-})
+     return figures
 
-# 方向リスト
-    outfield = ["Left","Left Center","Center","Right Center","Right"]
-    infield = ["Third Base","Shortstop","Second Base","First Base"]
-    all_directions = outfield + infield
-
-# 打球位置
-    positions = {
-    "Left":(0.2,0.75),"Left Center":(0.35,0.85),"Center":(0.5,0.9),
-    "Right Center":(0.65,0.85),"Right":(0.8,0.75),
-    "Third Base":(0.28,0.48),"Shortstop":(0.42,0.54),"Second Base":(0.58,0.54),"First Base":(0.72,0.48)
-}
-
-     # 内野の表示名変換用辞書
-    infield_display_names = {
-        "Third Base": "3B",
-        "Shortstop": "SS",
-        "Second Base": "2B",
-        "First Base": "1B"
-        }
-
-    def plot_direction(ax, df_side, title):
-        total = len(df_side)
-        if total == 0:
-           direction_percents = pd.Series(0, index=all_directions)
-        else:
-           direction_counts = df_side["打球方向"].value_counts().reindex(all_directions, fill_value=0)
-           direction_percents = (direction_counts / total * 100).round(1)
-
-        img_path = os.path.join("images","istockphoto-165551036-612x612 (1).jpg")
-        if not os.path.exists(img_path):
-           st.error(f"Image not found: {img_path}")
-           return
-        img = mpimg.imread(img_path)
-        ax.imshow(img, extent=[0,1,0,1])
-
-        for direction, (x,y) in positions.items():
-            percent = direction_percents.get(direction,0)
-            ax.text(x, y, f"{direction}\n{percent:.1f}%", ha="center", va="center", color="black", weight="bold")
-
-        ax.set_title(title)
-        ax.axis("off")
+    if not has_field_image():
+        st.error(f"Image not found: {FIELD_IMAGE}")
+        return figures
 
 # プロット
     col1, col2 = st.columns(2)
 
     with col1:
          st.subheader("Right-handed Batter")
-         df_r = df_exploded[df_exploded["打者左右"]=="右"]
-         fig_r, ax_r = plt.subplots(figsize=(6,6))
-         plot_direction(ax_r, df_r, "Right-handed")
-         st.pyplot(fig_r)
-         figures.append(fig_r)   # PDFに入れる
+         png = render_direction(direction_percentages(agg, "右"), "Right-handed")
+         st.image(png, width="stretch")
+         figures.append(png)   # PDFに入れる
     with col2:
          st.subheader("Left-handed Batter")
-         df_l = df_exploded[df_exploded["打者左右"]=="左"]
-         fig_l, ax_l = plt.subplots(figsize=(6,6))
-         plot_direction(ax_l, df_l, "Left-handed")
-         st.pyplot(fig_l)
-         figures.append(fig_l)   # PDFに入れる
+         png = render_direction(direction_percentages(agg, "左"), "Left-handed")
+         st.image(png, width="stretch")
+         figures.append(png)   # PDFに入れる
+
+    return figures
+
+
+
+def load_period_aggregates(storage, pitcher):
+    """
+    期間・試合の選択に応じた集計表を返す
+    - 全期間: ストレージの集計表をそのまま使う（CSV なら1球ごとに更新される集計表）
+    - 期間・試合: 該当する期間の投球だけを集計する
+    """
+    period = st.radio("Period", ["All", "Last game", "Game", "Last 30 days", "Date range"], horizontal=True,
+                      key="period")
+    if period == "All":
+        return storage.load_aggregates(pitcher)
+
+    sessions = storage.list_sessions(pitcher)
+    if not sessions:
+        return aggregate_frame(pd.DataFrame())
+    starts = [datetime.strptime(s[0], time_index.TIME_FORMAT) for s in sessions]
+    if period in ("Last game", "Game"):
+        i = 0
+        if period == "Game":
+            i = st.selectbox("Game", range(len(sessions)),
+                             format_func=lambda i: f"{sessions[i][0]} ({sessions[i][1]} pitches)")
+        # 新しい順なので、1つ前の要素が次の試合
+        start, end = starts[i], (starts[i - 1] if i > 0 else None)
+    elif period == "Last 30 days":
+        start, end = time_index.recent_start(30), None
+        st.caption(f"Since {start:%Y-%m-%d} (today included)")
+    else:
+        first = starts[-1].date()
+        last = datetime.strptime(storage.last_time(pitcher), time_index.TIME_FORMAT).date()
+        date_range = st.date_input("Date range", (first, last), min_value=first, max_value=last)
+        if len(date_range) != 2:
+            return aggregate_frame(pd.DataFrame())
+        start = datetime.combine(date_range[0], datetime.min.time())
+        end = datetime.combine(date_range[1], datetime.min.time()) + timedelta(days=1)
+
+    agg = storage.load_aggregates(pitcher, start, end)
+    st.caption(f"{agg['rows']} pitches")
+    return agg
+
+
+def show_analysis(DATA_DIR):
+
+    storage = get_storage(DATA_DIR)
+    pitchers = storage.pitchers()
+    if not pitchers:
+        st.warning("No data found. Please input pitcher data first.")
+        return
+
+    mode = st.radio("View", ["Pitcher", "Live", "Sequencing", "Outcomes", "Team"], horizontal=True)
+    if mode == "Live":
+        from live import show_live
+        show_live(storage, pitchers)
+        return
+    if mode == "Outcomes":
+        from outcomes import show_outcomes
+        show_outcomes(storage, pitchers)
+        return
+    if mode == "Team":
+        from team_analysis import show_team_analysis
+        show_team_analysis(storage, pitchers)
+        return
+    if mode == "Sequencing":
+        from sequencing import show_sequencing
+        show_sequencing(storage, pitchers)
+        return
+
+    # 1回だけ投手選択
+    pitcher = st.selectbox("Select Pitcher", pitchers)
+    with stage("analysis.load"):
+        agg = load_period_aggregates(storage, pitcher)
+    if agg["rows"] == 0:
+        st.info("No data available for this pitcher yet.")
+        return
 
+    with stage("analysis.charts"):
+        figures = show_charts(agg)
 
-    if st.button("📄 PDFを作成する"):
-        pdf_buffer = create_pdf(figures, title=f"{selected_file.replace('.csv','')} 投手分析レポート")
+    if st.session_state.get("period", "All") == "All":
+        # 全期間のレポートはバックグラウンドで作る（作成済みならすぐダウンロードできる）
+        from reports import show_report_job
+        show_report_job(f"pdf_{pitcher}", storage, [pitcher], "📄 PDFを作成する", f"{pitcher}_analysis.pdf")
+    elif st.button("📄 PDFを作成する"):
+        pdf_buffer = create_pdf(figures, title=f"{pitcher} 投手分析レポート")
         st.download_button(
             label="📥 PDFをダウンロード",
             data=pdf_buffer,
-            file_name=f"{selected_file.replace('.csv','')}_analysis.pdf",
+            file_name=f"{pitcher}_analysis.pdf",
             mime="application/pdf"
-        )     
\ No newline at end of file
+        )
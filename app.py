@@ -1,8 +1,8 @@
 import streamlit as st
-from input_form import show_input_form
-from analysis import show_analysis
 import os
 
+# 入力フォーム・分析・GitHub 同期はログイン後に読み込む（ログイン画面を速く表示するため）
+
 # 認証情報の読み込み（必ず最初に配置）
 try:
     users = st.secrets["auth"]["users"]
@@ -28,6 +28,7 @@ if not st.session_state['logged_in']:
     if submit_button:
         if username_input in users and password_input == password:
             st.session_state['logged_in'] = True
+            st.session_state['username'] = username_input
             st.success(f"{username_input}さん、ようこそ！")
             st.rerun() # ログイン成功後、アプリを再実行してコンテンツを表示
         else:
@@ -38,22 +39,36 @@ else:
 
     st.markdown("# ⚾ 野球分析アプリ")
 
+    from github_sync import show_sync_status
+
     # 保存先ディレクトリ
     DATA_DIR = "data"
     os.makedirs(DATA_DIR, exist_ok=True)
 
-    # タブUIでページ切り替え
-    tab1, tab2 = st.tabs(["📄 データ入力", "📊 分析"])
+    # ページ切り替え（タブだと両方のページが毎回実行されるので、選んだページだけ実行する）
+    page = st.radio("ページ", ["📄 データ入力", "📊 分析"], horizontal=True, key="page",
+                    label_visibility="collapsed")
 
-    with tab1:
+    if page == "📄 データ入力":
+        from input_form import show_input_form
         st.subheader("投球データ入力フォーム")
         st.write(DATA_DIR)
         st.caption(DATA_DIR)
         show_input_form(DATA_DIR)
-
-    with tab2:
+    else:
+        from analysis import show_analysis
         show_analysis(DATA_DIR)
 
+    # GitHub 同期の状態
+    show_sync_status(DATA_DIR)
+
+    # 処理時間・共有キャッシュのパネル（secrets.toml の auth.admins に含まれるユーザーだけ）
+    if st.session_state.get("username") in st.secrets["auth"].get("admins", []):
+        from timing import show_timing_panel
+        from shared_cache import show_cache_panel
+        show_timing_panel()
+        show_cache_panel()
+
     # ログアウトボタン（ログイン成功後に表示）
     st.sidebar.button("ログアウト", on_click=lambda: st.session_state.update(logged_in=False, username=None))
 
@@ -0,0 +1,74 @@
+"""
+1球保存の速度を比較するベンチマーク
+- 旧方式: read_csv → concat → to_csv（ファイル全体を書き直す）
+- 新方式: pitch_log.append_pitch（1行だけ追記）
+
+使い方: python benchmarks/bench_save.py [--sizes 100 10000 1000000] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pandas as pd
+
+from pitch_log import COLUMNS, append_pitch, format_row
+
+SAMPLE = {
+    "日時": "2025-08-09 23:12:55", "投手名": "bench", "球速": 110, "球種": "ストレート",
+    "コース": "外角低め", "カウント": "1B1S", "打者左右": "右", "結果": "ボール",
+    "モーション": " ", "牽制": " ", "打球方向": "なし",
+}
+
+
+def make_file(path, rows):
+    """指定行数のCSVを作る（ベンチマーク準備用なので一気に書く）"""
+    line = format_row(SAMPLE)
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(",".join(COLUMNS) + "\n")
+        f.write(line * rows)
+
+
+def save_legacy(path, data):
+    df_existing = pd.read_csv(path)
+    df_combined = pd.concat([df_existing, pd.DataFrame([data])], ignore_index=True)
+    df_combined.to_csv(path, index=False, encoding="utf-8-sig")
+
+
+def timeit(func, path, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path, SAMPLE)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--legacy-max", type=int, default=100_000,
+                        help="旧方式を計測する最大行数（大きいと時間がかかる）")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'append (ms)':>12} {'legacy (ms)':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.sizes:
+            path = os.path.join(tmp, f"bench_{rows}.csv")
+            make_file(path, rows)
+            append_ms = timeit(append_pitch, path, args.repeat) * 1000
+            if rows <= args.legacy_max:
+                make_file(path, rows)
+                legacy_ms = f"{timeit(save_legacy, path, min(args.repeat, 5)) * 1000:12.2f}"
+            else:
+                legacy_ms = f"{'skipped':>12}"
+            print(f"{rows:>10} {append_ms:12.2f} {legacy_ms}")
+
+
+if __name__ == "__main__":
+    main()
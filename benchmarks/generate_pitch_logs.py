@@ -0,0 +1,103 @@
+"""
+ベンチマーク用の投球ログを作る
+- 今の CSV と同じ列・同じ選択肢（vocabulary の PITCH_TYPES など）を使う
+- 日時は試合ごとにまとまって時刻順に並ぶ（1試合 80〜150 球、投球間隔 10〜40 秒）
+- 1000万行でもメモリに載せきらないよう、まとめて書き出す
+
+使い方: python benchmarks/generate_pitch_logs.py --rows 1000 100000 10000000 [--out-dir bench_data]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+import pandas as pd
+
+from vocabulary import PITCH_TYPES, LOCATIONS, PITCH_COUNTS, BATTING_SIDES, RESULTS, MOTIONS, PICKOFF, FIELD_ZONES
+from pitch_log import COLUMNS
+
+CHUNK_ROWS = 1_000_000
+
+# 実際のデータに近い出現頻度（指定しない列は一様）
+WEIGHTS = {
+    "球種": {"ストレート": 45, "スライダー": 15, "カーブ": 12, "チェンジアップ": 10, "フォーク": 5,
+            "ツーシーム": 5, "カットボール": 4, "シュート": 3, "その他": 1},
+    "カウント": {"0": 28, "1S": 12, "1B": 12, "2S": 6, "2B": 5, "1B1S": 10, "1B2S": 8,
+              "2B1S": 5, "2B2S": 6, "3B": 2, "3B1S": 2, "3B2S": 4},
+    "打者左右": {"右": 65, "左": 35},
+    "結果": {"ストライク": 20, "ボール": 35, "ファール": 15, "スイング": 10},
+    "モーション": {"": 80, "クイック": 20},
+    "牽制": {"": 95, "牽制": 5},
+    "打球方向": {"なし": 75},
+}
+
+VOCAB = {
+    "球種": PITCH_TYPES, "コース": LOCATIONS, "カウント": PITCH_COUNTS, "打者左右": BATTING_SIDES,
+    "結果": RESULTS, "モーション": MOTIONS, "牽制": PICKOFF, "打球方向": FIELD_ZONES,
+}
+
+
+def _probabilities(column):
+    """選択肢ごとの出現確率（WEIGHTS にない選択肢は残りを等分）"""
+    vocab = VOCAB[column]
+    weights = WEIGHTS.get(column, {})
+    rest = max(100 - sum(weights.values()), 0)
+    others = [v for v in vocab if v not in weights]
+    p = np.array([weights.get(v, rest / len(others) if others else 0) for v in vocab], dtype=float)
+    return p / p.sum()
+
+
+def generate_chunk(rng, rows, start_time, pitcher):
+    """rows 行分の DataFrame と、次のチャンクの開始時刻を返す"""
+    # 投球間隔: 普段は 10〜40 秒、試合の切れ目（約 120 球ごと）は 1〜7 日空ける
+    gaps = rng.integers(10, 41, size=rows).astype("int64")
+    new_game = rng.random(rows) < 1 / 120
+    gaps[new_game] = rng.integers(86_400, 7 * 86_400, size=int(new_game.sum()))
+    seconds = np.cumsum(gaps)
+    times = pd.Timestamp(start_time) + pd.to_timedelta(seconds, unit="s")
+
+    data = {
+        "日時": times.strftime("%Y-%m-%d %H:%M:%S"),
+        "投手名": np.full(rows, pitcher),
+        "球速": np.where(rng.random(rows) < 0.3, rng.integers(95, 131, size=rows), -1),
+    }
+    for column in VOCAB:
+        vocab = np.array(VOCAB[column], dtype=object)
+        data[column] = vocab[rng.choice(len(vocab), size=rows, p=_probabilities(column))]
+    df = pd.DataFrame(data)[COLUMNS]
+    df["球速"] = df["球速"].where(df["球速"] >= 0).astype("Int64")
+    return df, times[-1].to_pydatetime()
+
+
+def generate(path, rows, seed=0, pitcher="ベンチ投手"):
+    """rows 行の投球ログを path に書く"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2025, 4, 1, 13, 0, 0)
+    written = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        while written < rows:
+            n = min(CHUNK_ROWS, rows - written)
+            df, start = generate_chunk(rng, n, start, pitcher)
+            df.to_csv(f, index=False, header=(written == 0), lineterminator="\n")
+            written += n
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 10_000_000])
+    parser.add_argument("--out-dir", default="bench_data")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for rows in args.rows:
+        path = generate(os.path.join(args.out_dir, f"pitches_{rows}.csv"), rows, seed=args.seed)
+        print(f"{path}: {rows} rows, {os.path.getsize(path) / 1024 / 1024:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
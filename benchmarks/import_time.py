@@ -0,0 +1,58 @@
+"""
+起動時の import 時間を計測する
+- 各モジュールを新しい Python プロセスで `python -X importtime` 付きで import し、合計時間を出す
+- 重いライブラリ（matplotlib / seaborn / reportlab / github）が読み込まれていないかも確認する
+
+使い方: python benchmarks/import_time.py [--repeat 5] [--json import_time.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# 計測するモジュール（ログイン画面・入力タブ・分析タブで使うもの）
+MODULES = ["streamlit", "input_form", "analysis", "github_sync", "pitch_data"]
+HEAVY = ["matplotlib", "seaborn", "reportlab", "github"]
+
+
+def measure(module):
+    """1回分の import 時間（ミリ秒）と、読み込まれた重いライブラリを返す"""
+    code = f"import sys; import {module}; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            total_us = int(parts[1])
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return total_us / 1000, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="結果を JSON で保存するファイル")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'module':<14} {'median (ms)':>12}  heavy imports")
+    for module in MODULES:
+        runs = [measure(module) for _ in range(args.repeat)]
+        times = sorted(t for t, _ in runs)
+        median = times[len(times) // 2]
+        heavy = runs[0][1]
+        results[module] = {"median_ms": round(median, 1), "heavy_imports": heavy}
+        print(f"{module:<14} {median:12.1f}  {', '.join(heavy) or '-'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+保存・分析処理のベンチマーク（Streamlit サーバーなしで実行できる）
+- 1球保存（CSV 追記 + 集計表・時刻インデックス更新）
+- データ読み込み（CSV の解析）と取り込み時の正規化
+- 各集計（球種・カウント別・ゾーン・打球方向）と、集計表からの表作成
+- 各図の描画（キャッシュを通さずに描く時間）
+- create_pdf
+
+結果は JSON で出力するので、リリースごとに比較できる。
+使い方: python benchmarks/run_benchmarks.py [--rows 1000 100000] [--repeat 5] [--out bench.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+import aggregates
+import analysis
+import time_index
+from figure_cache import fig_to_png
+from generate_pitch_logs import generate
+from pitch_log import append_pitch
+from storage import on_pitch_saved
+from vocabulary import canonicalize_frame
+
+SAMPLE = {
+    "日時": "2030-01-01 12:00:00", "投手名": "ベンチ投手", "球速": 120, "球種": "スライダー",
+    "コース": "外角低め", "カウント": "1B1S", "打者左右": "左", "結果": "ボール",
+    "モーション": "", "牽制": "", "打球方向": "なし",
+}
+
+
+def timeit(func, repeat):
+    """func を repeat 回実行し、中央値・最小値（ミリ秒）を返す"""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {"median_ms": round(times[len(times) // 2], 3), "min_ms": round(times[0], 3)}, result
+
+
+def bench_size(path, repeat):
+    results = {}
+
+    def record(name, func, n=repeat):
+        stats, value = timeit(func, n)
+        results[name] = stats
+        return value
+
+    # --- 保存 ---
+    def save():
+        append_pitch(path, SAMPLE, after_write=lambda *written: on_pitch_saved(path, SAMPLE, *written))
+    aggregates.rebuild_aggregates(path)  # 集計表・インデックスを最新にしてから計測
+    time_index.rebuild_index(path)
+    record("save_pitch", save)
+
+    # --- 読み込み・正規化 ---
+    df_raw = record("load_csv", lambda: pd.read_csv(path))
+    df = record("canonicalize", lambda: canonicalize_frame(df_raw.copy()))
+
+    # --- 集計 ---
+    record("aggregate_frame", lambda: aggregates.aggregate_frame(df))
+    record("agg_pitch_types", lambda: df["球種"].value_counts())
+    record("agg_count_pitch", lambda: df.groupby(["カウント", "球種"], observed=True).size().unstack(fill_value=0))
+    record("agg_zones", lambda: df.groupby(["打者左右", "コース"], observed=True).size())
+    record("agg_directions", lambda: df.assign(打球方向=df["打球方向"].astype(str).str.split(","))
+           .explode("打球方向").groupby(["打者左右", "打球方向"]).size())
+    agg = record("load_aggregates", lambda: aggregates.load_aggregates(path))
+
+    # --- 集計表から図の元の表 ---
+    pitch_counts = record("table_pitch_types", lambda: analysis.count_pitch_types(agg))
+    count_pitch_percent = record("table_count_pitch", lambda: analysis.count_pitch_percentages(agg))
+    mat = record("table_zone", lambda: analysis.create_zone_matrix(analysis.zone_counts(agg, "右")))
+    directions = record("table_direction", lambda: analysis.direction_percentages(agg, "右"))
+
+    # --- 描画（キャッシュなし） ---
+    n = max(1, min(repeat, 3))
+    images = [
+        record("render_pitch_pie", lambda: fig_to_png(analysis.draw_pitch_pie(pitch_counts)), n),
+        record("render_count_bar", lambda: fig_to_png(analysis.draw_count_bar(count_pitch_percent)), n),
+        record("render_zone_heatmap", lambda: fig_to_png(analysis.draw_zone_heatmap(mat, "Reds", "Right")), n),
+        record("render_direction", lambda: analysis.draw_direction(directions, "Right"), n),
+    ]
+    record("create_pdf", lambda: analysis.create_pdf(images * 2 + images[2:]), n)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="結果を JSON で保存するファイル（省略すると標準出力）")
+    args = parser.parse_args()
+
+    import warnings
+    warnings.filterwarnings("ignore")  # 日本語フォントの警告などで結果が見づらくなるため
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "results": {},
+    }
+    tmp = tempfile.mkdtemp(prefix="pitch_bench_")
+    try:
+        for rows in args.rows:
+            path = generate(os.path.join(tmp, f"pitches_{rows}.csv"), rows)
+            report["results"][str(rows)] = bench_size(path, args.repeat)
+            print(f"{rows} rows done", file=sys.stderr)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+スコアブック・他チームの表（CSV / Excel）の一括取り込み
+- 列名は保存形式と同じ（日時・投手名・球速・球種・コース・カウント・打者左右・結果・モーション・牽制・打球方向）
+  - 日時は必須。投手名の列がなければ、取り込み時に投手名を指定する
+  - ほかの列はなくてもよい（空欄になる）
+- 値は正規の表記にそろえてから、列ごとにまとめて検査する（行ごとの Python ループはしない）
+  - 選択肢の列: 入力フォームと同じ選択肢か（"," 区切りは1つずつ）
+  - 日時: 読めるか（"2024/4/1 13:05" などの書き方も読み、保存形式にそろえる）
+  - 球速: 整数で SPEED_RANGE の範囲か
+  - 問題のある行は取り込まず、行番号・列・値・理由の一覧を返す
+- 正しい行は投手ごとに日時順に並べ、1人につき1回の書き込みで保存する
+  - 既に保存されている投球と全く同じ行は取り込まない（同じファイルを2回取り込んでも増えない）
+
+コマンドライン: python bulk_import.py FILE [FILE ...] [--pitcher 投手名] [--data-dir data] [--dry-run] [--report report.csv]
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from pitch_log import COLUMNS, format_rows
+from storage import DATA_DIR, get_storage
+from time_index import TIME_FORMAT
+from timing import stage
+from vocabulary import VOCABULARY, canonicalize_frame
+
+SPEED_RANGE = (30, 200)  # km/h
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm")  # 古い .xls（xlrd が必要）は対象外。.xlsx で保存し直して取り込む
+REPORT_COLUMNS = ["行", "列", "値", "理由"]
+BAD_NAME_PATTERN = r"[/\\\r\n]"  # 投手名はファイル名になるので、パスの区切り・改行は使えない
+
+
+def read_table(source, name=None):
+    """
+    CSV / Excel を全列文字列で読む
+    - source はパスかファイルオブジェクト（アップロードされたファイル）。種類は name（なければ source）の拡張子で決める
+    - CSV は UTF-8（BOM 付きも可）で読めなければ Shift_JIS（cp932）で読む
+    """
+    name = name or str(source)
+    if name.lower().endswith(".xls"):
+        raise ValueError("古い Excel 形式（.xls）は読めません。.xlsx で保存し直してください")
+    if name.lower().endswith(EXCEL_EXTENSIONS):
+        try:
+            return pd.read_excel(source, dtype=str)
+        except ImportError as e:
+            raise ValueError(f"Excel の読み込みには openpyxl が必要です（{e}）") from e
+    try:
+        return pd.read_csv(source, dtype=str, encoding="utf-8-sig")
+    except UnicodeDecodeError:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return pd.read_csv(source, dtype=str, encoding="cp932")
+
+
+class _Problems:
+    """問題のある行を列ごとにまとめて記録する"""
+
+    def __init__(self, n):
+        self.bad = np.zeros(n, dtype=bool)
+        self.parts = []
+
+    def add(self, mask, column, values, reason):
+        mask = np.asarray(mask, dtype=bool)
+        if not mask.any():
+            return
+        self.bad |= mask
+        self.parts.append(pd.DataFrame({
+            "行": np.flatnonzero(mask) + 2,  # 1行目はヘッダー
+            "列": column,
+            "値": pd.Series(values, dtype=object).fillna("").to_numpy()[mask],
+            "理由": reason,
+        }))
+
+    def frame(self):
+        if not self.parts:
+            return pd.DataFrame(columns=REPORT_COLUMNS)
+        return pd.concat(self.parts, ignore_index=True).sort_values(["行", "列"], kind="stable", ignore_index=True)
+
+
+def _blank(series):
+    return series.isna().to_numpy() | (series.astype("string").str.strip() == "").fillna(True).to_numpy()
+
+
+def _parse_times(series):
+    """日時を datetime にする（保存形式で読めなかった値だけ、ほかの書き方を試す）"""
+    times = pd.to_datetime(series, format=TIME_FORMAT, errors="coerce")
+    retry = times.isna() & series.notna()
+    if retry.any():
+        # 書き方が混ざっていてもよいよう、値の種類ごとに読む
+        codes, uniques = pd.factorize(series[retry])
+        parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format="mixed", errors="coerce")
+        times[retry] = parsed.to_numpy()[codes]
+    return times
+
+
+def _invalid_choices(series, vocab):
+    """選択肢にない値を含む行（"," 区切りは1つずつ確認する。値の種類の数だけ調べる）"""
+    codes, uniques = pd.factorize(series)
+    allowed = set(vocab)
+    ok = np.array([all(piece in allowed for piece in str(u).split(",")) for u in uniques] + [True])
+    return ~ok[codes]
+
+
+def validate(df, pitcher=None):
+    """
+    読み込んだ表を検査し、保存できる形にそろえる
+    戻り値: (正しい行の DataFrame（列は COLUMNS）, 問題の一覧, 読み飛ばした列)
+    """
+    df = df.rename(columns=lambda c: str(c).strip()).reset_index(drop=True)
+    required = ["日時"] + ([] if pitcher else ["投手名"])
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise ValueError(f"必要な列がありません: {', '.join(missing)}")
+    ignored = [c for c in df.columns if c not in COLUMNS]
+    rows = df.reindex(columns=COLUMNS)
+    problems = _Problems(len(rows))
+
+    # 投手名
+    if pitcher:
+        rows["投手名"] = pitcher
+    names = rows["投手名"].astype("string").str.strip()
+    problems.add(_blank(names), "投手名", names, "投手名がありません")
+    bad_name = names.str.contains(BAD_NAME_PATTERN, regex=True) | names.str.startswith(".")
+    problems.add(bad_name.fillna(False), "投手名", names, "投手名に使えない文字があります")
+    rows["投手名"] = names
+
+    # 日時
+    times = _parse_times(rows["日時"].astype("string").str.strip())
+    problems.add(times.isna(), "日時", rows["日時"], "日時が読めません")
+    rows["日時"] = times.dt.strftime(TIME_FORMAT)
+
+    # 球速（空欄は可）
+    speed_text = rows["球速"].astype("string").str.strip()
+    speed = pd.to_numeric(speed_text, errors="coerce")
+    given = ~_blank(speed_text)
+    wrong = given & (speed.isna() | (speed % 1 != 0) | ~speed.between(*SPEED_RANGE)).fillna(True).to_numpy()
+    problems.add(wrong, "球速", speed_text, f"球速は {SPEED_RANGE[0]}〜{SPEED_RANGE[1]} の整数で入力してください")
+    rows["球速"] = speed.where(given & ~wrong).round().astype("Int64")
+
+    # 選択肢の列（正規の表記にそろえてから調べる）
+    with stage("import.canonicalize"):
+        canonicalize_frame(rows)
+    for column, vocab in VOCABULARY.items():
+        values = rows[column].where(~_blank(rows[column]))
+        rows[column] = values
+        problems.add(_invalid_choices(values, vocab), column, values, "選択肢にない値です")
+
+    return rows[~problems.bad].reset_index(drop=True), problems.frame(), ignored
+
+
+def _row_keys(df):
+    """行を比べるためのキー（保存する CSV の1行と同じ文字列。object 配列なので isin はハッシュ表で比べる）"""
+    df = df.reindex(columns=COLUMNS).assign(球速=pd.to_numeric(df["球速"], errors="coerce").round().astype("Int64"))
+    return np.array(format_rows(df).splitlines(), dtype=object)
+
+
+def _new_rows(storage, pitcher, rows):
+    """保存済みの投球と全く同じ行を除く"""
+    if pitcher not in storage.pitchers():
+        return rows
+    existing = storage.load_pitches(pitcher)
+    if existing.empty:
+        return rows
+    return rows[~pd.Index(_row_keys(rows), dtype=object).isin(_row_keys(existing))]
+
+
+def import_table(df, storage, pitcher=None, dry_run=False):
+    """
+    読み込んだ表を検査して保存する
+    - pitcher: 投手名の列がない（または上書きしたい）ときの投手名
+    - dry_run: 検査だけ行い、保存しない
+    戻り値: {"rows": ファイルの行数, "saved": {投手名: 保存した行数}, "duplicates": 保存済みと同じで飛ばした行数,
+             "problems": 問題の一覧, "bad_rows": 問題のある行数, "ignored_columns": 読み飛ばした列}
+    """
+    with stage("import.validate"):
+        rows, problems, ignored = validate(df, pitcher)
+    result = {"rows": len(df), "saved": {}, "duplicates": 0, "problems": problems,
+              "bad_rows": problems["行"].nunique(), "ignored_columns": ignored}
+    with stage("import.write"):
+        for name, group in rows.groupby("投手名", sort=True):
+            group = group.sort_values("日時", kind="stable")
+            new = _new_rows(storage, name, group)
+            result["duplicates"] += len(group) - len(new)
+            if new.empty:
+                continue
+            if not dry_run:
+                storage.append_pitches(name, new.reset_index(drop=True))
+            result["saved"][name] = len(new)
+    return result
+
+
+def import_file(source, storage, name=None, pitcher=None, dry_run=False):
+    """CSV / Excel を1つ取り込む（read_table → import_table）"""
+    with stage("import.read"):
+        df = read_table(source, name)
+    return import_table(df, storage, pitcher=pitcher, dry_run=dry_run)
+
+
+def show_bulk_import(data_dir):
+    """入力タブの一括取り込み画面"""
+    import streamlit as st
+
+    uploaded = st.file_uploader("CSV / Excel ファイル", type=["csv", "xlsx", "xlsm"])
+    pitcher = st.text_input("投手名（ファイルに投手名の列がない場合）", key="import_pitcher").strip()
+    dry_run = st.checkbox("確認だけ（保存しない）", key="import_dry_run")
+    if uploaded is None or not st.button("📥 取り込む"):
+        return
+
+    try:
+        result = import_file(uploaded, get_storage(data_dir), name=uploaded.name,
+                             pitcher=pitcher or None, dry_run=dry_run)
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    saved = sum(result["saved"].values())
+    verb = "保存できます" if dry_run else "保存しました"
+    st.success(f"{result['rows']} 行中 {saved} 行を{verb}（問題のある行 {result['bad_rows']}・保存済みと重複 {result['duplicates']}）")
+    if result["saved"]:
+        st.dataframe(pd.DataFrame({"投手名": list(result["saved"]), "行数": list(result["saved"].values())}),
+                     hide_index=True)
+    if result["ignored_columns"]:
+        st.warning(f"読み飛ばした列: {', '.join(result['ignored_columns'])}")
+    if not result["problems"].empty:
+        st.subheader("問題のある行（取り込んでいません）")
+        st.dataframe(result["problems"].head(1000), hide_index=True)
+        st.download_button("問題の一覧をダウンロード", result["problems"].to_csv(index=False).encode("utf-8-sig"),
+                           file_name="import_problems.csv", mime="text/csv")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV / Excel の投球データを一括で取り込む")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--pitcher", help="投手名（ファイルに投手名の列がない場合）")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--dry-run", action="store_true", help="検査だけ行い、保存しない")
+    parser.add_argument("--report", help="問題のある行の一覧を書き出す CSV")
+    args = parser.parse_args()
+
+    storage = get_storage(args.data_dir)
+    reports = []
+    for path in args.files:
+        try:
+            result = import_file(path, storage, pitcher=args.pitcher, dry_run=args.dry_run)
+        except ValueError as e:
+            print(f"{path}: {e}")
+            reports.append(pd.DataFrame({"ファイル": [path], "行": [None], "列": [None], "値": [None], "理由": [str(e)]}))
+            continue
+        print(f"{path}: {result['rows']} rows, saved {sum(result['saved'].values())}, "
+              f"bad {result['bad_rows']}, duplicates {result['duplicates']}"
+              + (" (dry run)" if args.dry_run else ""))
+        for name, n in result["saved"].items():
+            print(f"  {name}: {n}")
+        if result["ignored_columns"]:
+            print(f"  ignored columns: {', '.join(result['ignored_columns'])}")
+        for row in result["problems"].head(20).itertuples(index=False):
+            print(f"  line {row.行} {row.列}={row.値!r}: {row.理由}")
+        if len(result["problems"]) > 20:
+            print(f"  ... {len(result['problems']) - 20} more")
+        reports.append(result["problems"].assign(ファイル=path))
+    problems = pd.concat(reports, ignore_index=True) if reports else pd.DataFrame()
+    if args.report:
+        problems.to_csv(args.report, index=False, encoding="utf-8-sig")
+        print(f"-> {args.report}")
+    sys.exit(1 if not problems.empty else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+投球データの列指向保存（Parquet）
+- 球種・コース・カウントなどは選択肢が少ないので辞書エンコードのカテゴリ型で保存する
+- 日時は文字列ではなく datetime 型で保存する
+- CSV は入力用のログとしてそのまま残し、Parquet は分析用の読み込みに使う
+- Parquet には作ったときの CSV の版（サイズ・更新時刻）を書いておき、CSV が変わっていれば古いとみなす
+  - 古ければ CSV を読んで返し、Parquet はバックグラウンドで作り直す（入力のたびに画面を待たせない）
+
+有効にするには環境変数 PITCH_STORAGE=parquet を設定する。
+既存CSVの変換: python columnar_store.py migrate [--data-dir data]
+"""
+import argparse
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from vocabulary import PITCH_TYPES, LOCATIONS, PITCH_COUNTS, BATTING_SIDES, RESULTS, MOTIONS, PICKOFF, FIELD_ZONES
+
+PARQUET_DIR = "parquet"  # data/ の下に置く
+SOURCE_KEY = b"pitch_source"  # Parquet のメタデータ: 元にした CSV の版
+
+# 列ごとの選択肢（入力フォームと同じ）
+CATEGORY_COLUMNS = {
+    "投手名": [],
+    "球種": PITCH_TYPES,
+    "コース": LOCATIONS,
+    "カウント": PITCH_COUNTS,
+    "打者左右": BATTING_SIDES,
+    "結果": RESULTS,
+    "モーション": MOTIONS,
+    "牽制": PICKOFF,
+    "打球方向": FIELD_ZONES,
+}
+
+
+def parquet_path(csv_path):
+    """data/投手.csv → data/parquet/投手.parquet"""
+    data_dir, name = os.path.split(csv_path)
+    return os.path.join(data_dir, PARQUET_DIR, os.path.splitext(name)[0] + ".parquet")
+
+
+def to_columnar(df):
+    """
+    CSV から読んだ DataFrame を列指向の型に変換する
+    - 選択肢にない値（複数選択や古い表記）も失わないよう、カテゴリに追加する
+    """
+    df = df.copy()
+    if "日時" in df.columns:
+        df["日時"] = pd.to_datetime(df["日時"], errors="coerce")
+    if "球速" in df.columns:
+        df["球速"] = pd.to_numeric(df["球速"], errors="coerce").astype("Int16")
+    for col, vocab in CATEGORY_COLUMNS.items():
+        if col not in df.columns:
+            continue
+        values = df[col].astype("string")
+        extra = sorted(set(values.dropna().unique()) - set(vocab))
+        df[col] = pd.Categorical(values, categories=list(dict.fromkeys(vocab)) + extra)
+    return df
+
+
+def source_version(csv_path):
+    """CSV の版（サイズ・更新時刻）"""
+    st = os.stat(csv_path)
+    return f"{st.st_size}:{st.st_mtime_ns}".encode()
+
+
+def write_parquet(df, path, source=None):
+    """
+    列指向に変換して Parquet で保存する（途中で落ちても壊れないよう一時ファイル経由）
+    - source: 元にした CSV の版（読み込む前に取った値。読み込み中に追記されても古いと分かる）
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(to_columnar(df), preserve_index=False)
+    if source is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), SOURCE_KEY: source})
+    tmp = f"{path}.{os.getpid()}.tmp"  # 複数のプロセスが同じ投手を作り直しても混ざらない
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def read_parquet(path):
+    """Parquet を読み込む（カテゴリ型・datetime 型のまま返す）"""
+    return pd.read_parquet(path, engine="pyarrow")
+
+
+def is_fresh(csv_path):
+    """Parquet が今の CSV から作られたものか"""
+    try:
+        metadata = pq.read_schema(parquet_path(csv_path)).metadata or {}
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return False
+    return metadata.get(SOURCE_KEY) == source_version(csv_path)
+
+
+def rebuild_parquet(csv_path):
+    """CSV から Parquet を作り直す"""
+    source = source_version(csv_path)
+    df = pd.read_csv(csv_path)
+    write_parquet(df, parquet_path(csv_path), source)
+    return df
+
+
+_building = set()
+_building_lock = threading.Lock()
+
+
+def rebuild_in_background(csv_path):
+    """Parquet をバックグラウンドで作り直す（同じ投手の作り直しが動いていれば何もしない）"""
+    with _building_lock:
+        if csv_path in _building:
+            return
+        _building.add(csv_path)
+
+    def run():
+        try:
+            if not is_fresh(csv_path):
+                rebuild_parquet(csv_path)
+        finally:
+            with _building_lock:
+                _building.discard(csv_path)
+
+    threading.Thread(target=run, name=f"parquet-{os.path.basename(csv_path)}", daemon=True).start()
+
+
+def read_pitches(csv_path):
+    """
+    分析用に投手データを読む
+    - Parquet が今の CSV から作られていれば Parquet を読む
+    - 古ければ（入力で追記された）CSV を読んで列指向の型にして返し、Parquet はバックグラウンドで作り直す
+    """
+    if is_fresh(csv_path):
+        return read_parquet(parquet_path(csv_path))
+    df = pd.read_csv(csv_path)
+    rebuild_in_background(csv_path)
+    return to_columnar(df)
+
+
+def migrate(data_dir):
+    """data_dir の全CSVを Parquet に変換し、サイズを表示する"""
+    for name in sorted(os.listdir(data_dir)):
+        if not name.endswith(".csv"):
+            continue
+        csv_path = os.path.join(data_dir, name)
+        pq_path = parquet_path(csv_path)
+        df = rebuild_parquet(csv_path)
+        csv_mem = df.memory_usage(deep=True).sum()
+        pq_mem = read_parquet(pq_path).memory_usage(deep=True).sum()
+        print(f"{name}: {len(df)} rows, memory {csv_mem / 1024:.1f}KB -> {pq_mem / 1024:.1f}KB, "
+              f"file {os.path.getsize(csv_path) / 1024:.1f}KB -> {os.path.getsize(pq_path) / 1024:.1f}KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="投球データの Parquet 変換")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_migrate = sub.add_parser("migrate", help="既存CSVを Parquet に変換する")
+    p_migrate.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrate(args.data_dir)
+
+
+if __name__ == "__main__":
+    main()
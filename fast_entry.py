@@ -0,0 +1,145 @@
+"""
+クイック入力（試合中に1球を素早く入れる）
+- 1行のコードで1球を入力する: 例 "ST 外低 1B1S 右 ボール"
+  - 空白区切り・順番は自由。球種・コース・カウント・打者左右・結果・モーション・牽制・打球方向
+  - 数字だけ（"142" など）は球速
+  - 正式な表記（"ストレート" など）もそのまま使える
+- 画面の部分更新（st.fragment）の中で動かすので、送信してもページ全体は再実行しない
+- 送信後の入力欄のクリアはコールバックの中で行う（st.rerun() しない）
+"""
+import unicodedata
+from datetime import datetime
+
+import streamlit as st
+
+from storage import get_storage
+from timing import stage
+from vocabulary import ALIASES, VOCABULARY
+
+# 略記 → (列, 正規の表記)
+SHORT_CODES = {
+    "球種": {"ST": "ストレート", "FB": "ストレート", "SL": "スライダー", "CB": "カーブ", "CV": "カーブ",
+           "FK": "フォーク", "CH": "チェンジアップ", "TS": "ツーシーム", "CT": "カットボール",
+           "SH": "シュート", "OT": "その他"},
+    "コース": {"内高": "内角高め", "内中": "内角真ん中", "内低": "内角低め",
+            "外高": "外角高め", "外中": "外角真ん中", "外低": "外角低め",
+            "中高": "真ん中高め", "中低": "真ん中低め", "中": "真ん中"},
+    "打者左右": {"R": "右", "L": "左"},
+    "結果": {"S": "ストライク", "B": "ボール", "F": "ファール", "SW": "スイング"},
+}
+EXAMPLE = "ST 外低 1B1S 右 ボール"
+RECENT = 5  # 画面に出す直近の入力数
+
+
+def _key(token):
+    return unicodedata.normalize("NFKC", token).strip().upper()
+
+
+def _build_codes():
+    """
+    コード1語 → (列, 正規の表記) の表
+    - 略記 → 正式な表記 → 別名 の順に登録し、先に登録したものを優先する
+      （"1B" はカウント。打球方向の別名 "1B"（ファースト）には使わない）
+    """
+    codes = {}
+    for column, table in SHORT_CODES.items():
+        for short, value in table.items():
+            codes.setdefault(_key(short), (column, value))
+    for column, values in VOCABULARY.items():
+        for value in values:
+            if value:
+                codes.setdefault(_key(value), (column, value))
+    for column, table in ALIASES.items():
+        for alias, value in table.items():
+            codes.setdefault(_key(alias), (column, value))
+    return codes
+
+
+CODES = _build_codes()
+
+
+def parse_code(code):
+    """
+    コード1行を {列: 値} にする（球速は int）
+    - 知らない語・同じ項目が2回ある場合は ValueError（メッセージはそのまま画面に出す）
+    """
+    result = {}
+    for token in code.split():
+        key = _key(token)
+        if key in CODES:
+            column, value = CODES[key]
+        elif key.isdigit():
+            column, value = "球速", int(key)
+        else:
+            raise ValueError(f"「{token}」が分かりません")
+        if column in result:
+            raise ValueError(f"{column}が2回入力されています（{token}）")
+        result[column] = value
+    if not result:
+        raise ValueError("コードを入力してください")
+    return result
+
+
+def pitch_from_code(pitcher_name, code):
+    """入力フォームと同じ形の1球分の dict を作る（入力しなかった項目は空・既定値）"""
+    parsed = parse_code(code)
+    return {
+        "日時": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "投手名": pitcher_name,
+        "球速": parsed.get("球速"),
+        "球種": parsed.get("球種", ""),
+        "コース": parsed.get("コース", ""),
+        "カウント": parsed.get("カウント", ""),
+        "打者左右": parsed.get("打者左右", ""),
+        "結果": parsed.get("結果", ""),
+        "モーション": parsed.get("モーション", ""),
+        "牽制": parsed.get("牽制", ""),
+        "打球方向": parsed.get("打球方向", VOCABULARY["打球方向"][0]),
+    }
+
+
+def _submit(data_dir):
+    """送信ボタンのコールバック（ここで保存し、コード欄を空にする）"""
+    pitcher_name = st.session_state.get("fast_pitcher", "").strip()
+    code = st.session_state.get("fast_code", "")
+    if not pitcher_name:
+        st.session_state["fast_message"] = ("error", "投手名を入力してください")
+        return
+    try:
+        data = pitch_from_code(pitcher_name, code)
+    except ValueError as e:
+        st.session_state["fast_message"] = ("error", str(e))
+        return  # コードは消さずに残す（直して送り直せるように）
+
+    with stage("input.save_pitch"):
+        get_storage(data_dir).append_pitch(data)
+
+    recent = st.session_state.setdefault("fast_recent", [])
+    recent.insert(0, f"{data['日時'][11:]}  {pitcher_name}  {code.strip()}")
+    del recent[RECENT:]
+    st.session_state["fast_code"] = ""
+    st.session_state["fast_message"] = ("success", f"{pitcher_name} のデータを保存しました ✅")
+
+
+@st.fragment
+def show_fast_entry(data_dir):
+    with st.form("fast_entry_form", border=False):
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            st.text_input("投手名", key="fast_pitcher")
+        with col2:
+            st.text_input("コード（Enter で送信）", key="fast_code", placeholder=EXAMPLE)
+        st.form_submit_button("✅ 送信", on_click=_submit, args=(data_dir,))
+
+    message = st.session_state.pop("fast_message", None)
+    if message:
+        kind, text = message
+        (st.success if kind == "success" else st.error)(text)
+    for line in st.session_state.get("fast_recent", []):
+        st.text(line)
+
+    with st.expander("コード一覧"):
+        for column, table in SHORT_CODES.items():
+            st.caption(f"{column}: " + "  ".join(f"{short}={value}" for short, value in table.items()))
+        st.caption("カウント: 0 1S 2S 1B … 3B2S（そのまま）　数字: 球速　"
+                   "モーション: クイック　牽制: 牽制　打球方向: レフト・センターなど（正式な表記）")
@@ -0,0 +1,89 @@
+"""
+打球方向チャート（球場画像の上に割合を書く）
+- 球場画像はプロセスで1回だけデコードし、読み取り専用で全セッションが共有する
+- タイトル入りの下地は1回だけ作っておき、毎回は下地のコピーに9個のラベルを書くだけ
+  （matplotlib の Figure は使わない）
+"""
+import importlib.util
+import os
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+
+from timing import stage
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FIELD_IMAGE = os.path.join(BASE_DIR, "images", "istockphoto-165551036-612x612 (1).jpg")
+
+SIZE = 612           # 球場部分の一辺（px）。元の図と同じく正方形に引き伸ばす
+TITLE_HEIGHT = 44    # タイトル部分の高さ（px）
+LABEL_FONT_SIZE = 15
+TITLE_FONT_SIZE = 20
+
+
+@lru_cache(maxsize=1)
+def field_image():
+    """球場画像（RGB の ndarray、読み取り専用。デコードはプロセスで1回だけなので計測もその1回だけ）"""
+    from PIL import Image
+    with stage("render.field_image_load"), Image.open(FIELD_IMAGE) as img:
+        array = np.asarray(img.convert("RGB").resize((SIZE, SIZE), Image.BILINEAR))
+    array.setflags(write=False)
+    return array
+
+
+def has_field_image():
+    """球場画像が読めるか（読めればデコード結果はそのまま共有される）"""
+    try:
+        field_image()
+    except OSError:
+        return False
+    return True
+
+
+def _font_path():
+    """matplotlib 同梱の DejaVu Sans Bold（元の図と同じ書体。matplotlib 自体は読み込まない）"""
+    spec = importlib.util.find_spec("matplotlib")
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    return os.path.join(spec.submodule_search_locations[0], "mpl-data", "fonts", "ttf", "DejaVuSans-Bold.ttf")
+
+
+@lru_cache(maxsize=None)
+def _font(size):
+    from PIL import ImageFont
+    path = _font_path()
+    try:
+        return ImageFont.truetype(path, size) if path else ImageFont.load_default(size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+
+@lru_cache(maxsize=8)
+def _base(title):
+    """タイトル入りの下地（描き込むときは copy() すること）"""
+    from PIL import Image, ImageDraw
+    base = Image.new("RGB", (SIZE, SIZE + TITLE_HEIGHT), "white")
+    base.paste(Image.fromarray(field_image()), (0, TITLE_HEIGHT))
+    ImageDraw.Draw(base).text((SIZE / 2, TITLE_HEIGHT / 2), title, fill="black",
+                              font=_font(TITLE_FONT_SIZE), anchor="mm")
+    return base
+
+
+def draw_direction_png(direction_percents, positions, title):
+    """
+    打球方向チャートの PNG を返す
+    - positions: {方向: (x, y)}（0〜1、左下が原点。元の matplotlib 版と同じ座標）
+    """
+    from PIL import ImageDraw
+    img = _base(title).copy()
+    draw = ImageDraw.Draw(img)
+    font = _font(LABEL_FONT_SIZE)
+    for direction, (x, y) in positions.items():
+        percent = direction_percents.get(direction, 0)
+        xy = (x * SIZE, TITLE_HEIGHT + (1 - y) * SIZE)
+        draw.multiline_text(xy, f"{direction}\n{percent:.1f}%", fill="black", font=font,
+                            anchor="mm", align="center")
+    buf = BytesIO()
+    img.save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
@@ -0,0 +1,80 @@
+import hashlib
+import os
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from shared_cache import SharedCache
+from timing import stage
+
+# 図の描き方を変えたら番号を上げる（古いキャッシュを使わないため）
+RENDER_VERSION = 2
+DPI = 150
+
+# キャッシュの上限（MB）。環境変数 FIGURE_CACHE_MB で変更できる
+CACHE_MAX_BYTES = int(os.environ.get("FIGURE_CACHE_MB", "64")) * 1024 * 1024
+
+
+def _feed(h, obj):
+    """集計データをハッシュに入れる（同じ内容なら同じキーになる）"""
+    if isinstance(obj, (pd.Series, pd.DataFrame)):
+        h.update(obj.to_csv().encode("utf-8"))
+    elif isinstance(obj, np.ndarray):
+        h.update(str(obj.shape).encode())
+        h.update(np.ascontiguousarray(obj, dtype=np.float64).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            _feed(h, item)
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=str):
+            _feed(h, key)
+            _feed(h, obj[key])
+    else:
+        h.update(repr(obj).encode("utf-8"))
+    h.update(b"\x00")
+
+
+def make_key(kind, data, **params):
+    """図の種類・集計データ・描画パラメータからキャッシュキーを作る"""
+    h = hashlib.sha256()
+    _feed(h, (RENDER_VERSION, kind, data, params))
+    return h.hexdigest()
+
+
+def fig_to_png(fig, dpi=DPI):
+    """図を PNG のバイト列にして、図は閉じる（メモリに溜めない）"""
+    buf = BytesIO()
+    try:
+        fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+    finally:
+        import matplotlib.pyplot as plt
+        plt.close(fig)
+    return buf.getvalue()
+
+
+# 図（PNG）はデータとは別の上限で、同じ仕組みの共有キャッシュに置く
+_cache = SharedCache(CACHE_MAX_BYTES)
+
+
+def stats():
+    return _cache.stats()
+
+
+def clear():
+    _cache.clear()
+
+
+def render_cached(kind, data, draw, **params):
+    """
+    描画済み PNG を返す
+    - 同じ集計データ・パラメータなら matplotlib を一切使わずキャッシュから返す
+    - draw(data, **params) は matplotlib の Figure か、描画済みの PNG（bytes）を返す関数
+    """
+    def render():
+        with stage(f"render.{kind}"):
+            result = draw(data, **params)
+            return result if isinstance(result, bytes) else fig_to_png(result)
+
+    # キーは内容のハッシュなので版は使わない（描き方を変えたら RENDER_VERSION を上げる）
+    return _cache.get(kind, None, make_key(kind, data, **params), RENDER_VERSION, render)
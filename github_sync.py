@@ -0,0 +1,249 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from timing import stage
+
+# 同期待ちファイルの一覧（プロセスが再起動しても消えないようにディスクに置く）
+JOURNAL_NAME = ".github_sync_pending.json"
+
+DEFAULT_REPO = "kaa266/baseball-app"
+REPO_DATA_DIR = "data"    # リポジトリ内で投手ファイルを置くフォルダ（アプリの作業ディレクトリとは関係ない）
+DEFAULT_INTERVAL = 30.0   # 何秒ごとにまとめてコミットするか
+MAX_BACKOFF = 600.0       # リトライ間隔の上限（秒）
+
+
+class GitHubSync:
+    """
+    投球データを GitHub にまとめて保存するバックグラウンド同期
+    - enqueue() はジャーナルに書くだけなので入力画面を待たせない
+    - interval 秒ごとに、変更のあった投手ファイルを1コミットにまとめて送る
+      （Git tree API: blob → tree → commit → ref 更新）
+    - 失敗したら指数バックオフでリトライする
+    - 同期待ちはジャーナルファイルに残るので、再起動しても投球は失われない
+    """
+
+    def __init__(self, token, repo_name=DEFAULT_REPO, data_dir="data",
+                 interval=DEFAULT_INTERVAL, base_url=None, branch=None, client_options=None):
+        self.token = token
+        self.repo_name = repo_name
+        self.data_dir = data_dir
+        self.interval = float(interval)
+        self.base_url = base_url
+        self.branch = branch
+        # Github() に渡す追加の引数（テストで書き込みの待ち時間・PyGithub 自身のリトライを切るなど）
+        self.client_options = client_options or {}
+        self.journal_path = os.path.join(data_dir, JOURNAL_NAME)
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._repo = None
+        # ファイルパス → 世代番号（同期中に追記されたら番号が進む）
+        self._pending = self._load_journal()
+        self._status = {
+            "state": "pending" if self._pending else "idle",
+            "last_success": None,
+            "last_error": None,
+            "retries": 0,
+        }
+
+    # ----------------------------
+    # ジャーナル
+    # ----------------------------
+    def _load_journal(self):
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                return {path: 0 for path in json.load(f)}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_journal(self):
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(sorted(self._pending), f, ensure_ascii=False)
+        os.replace(tmp, self.journal_path)
+
+    # ----------------------------
+    # 公開メソッド
+    # ----------------------------
+    def enqueue(self, filepath):
+        """
+        ファイルを同期待ちに追加する（すぐ戻る）
+        - リポジトリ内のパスは data/<ファイル名>（アプリをどのディレクトリから起動しても同じ）
+        """
+        path = f"{REPO_DATA_DIR}/{os.path.basename(filepath)}"
+        with self._lock:
+            self._pending[path] = self._pending.get(path, 0) + 1
+            self._save_journal()
+            if self._status["state"] == "idle":
+                self._status["state"] = "pending"
+
+    def flush(self):
+        """次の同期を待たずにすぐ実行させる"""
+        self._wake.set()
+
+    def status(self):
+        """サイドバー表示用の状態（state / pending / last_success / last_error / retries）"""
+        with self._lock:
+            status = dict(self._status)
+            status["pending"] = len(self._pending)
+        return status
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="github-sync", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ----------------------------
+    # 同期処理
+    # ----------------------------
+    def _run(self):
+        delay = self.interval
+        while not self._stop.is_set():
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.sync_once()
+                delay = self.interval
+            except Exception:
+                with self._lock:  # 状態・エラーは sync_once が記録している
+                    self._status["retries"] += 1
+                    retries = self._status["retries"]
+                delay = min(self.interval * (2 ** retries), MAX_BACKOFF)
+
+    def _local_path(self, path):
+        """リポジトリ内のパス（data/<ファイル名>）→ 手元のファイル"""
+        return os.path.join(self.data_dir, os.path.basename(path))
+
+    def _get_repo(self):
+        if self._repo is None:
+            from github import Auth, Github
+            options = dict(self.client_options)
+            if self.base_url:
+                options["base_url"] = self.base_url
+            g = Github(auth=Auth.Token(self.token), **options)
+            self._repo = g.get_repo(self.repo_name)
+        return self._repo
+
+    def sync_once(self):
+        """
+        同期待ちのファイルを1コミットで GitHub に送る
+        - 失敗したら状態を "error" にして例外をそのまま投げる（ファイルは同期待ちのまま残る）
+        戻り値: 送ったファイル数
+        """
+        with self._lock:
+            snapshot = dict(self._pending)
+        if not snapshot:
+            return 0
+
+        with self._lock:
+            self._status["state"] = "syncing"
+        try:
+            sent = self._upload(snapshot)
+        except Exception as e:
+            with self._lock:
+                self._status["state"] = "error"
+                self._status["last_error"] = f"{datetime.now():%H:%M:%S} {e}"
+            raise
+
+        with self._lock:
+            # 同期中に追記されたファイルは次回に回す
+            for path, generation in snapshot.items():
+                if self._pending.get(path) == generation:
+                    del self._pending[path]
+            self._save_journal()
+            self._status["state"] = "pending" if self._pending else "idle"
+            self._status["last_success"] = f"{datetime.now():%H:%M:%S}"
+            self._status["last_error"] = None
+            self._status["retries"] = 0
+        return sent
+
+    def _upload(self, snapshot):
+        """snapshot のファイルを1コミットにして送る（戻り値: 送ったファイル数）"""
+        from github import InputGitTreeElement
+
+        repo = self._get_repo()
+        branch = self.branch or repo.default_branch
+        ref = repo.get_git_ref(f"heads/{branch}")
+        parent = repo.get_git_commit(ref.object.sha)
+
+        elements = []
+        with stage("github.upload_blobs"):
+            for path in snapshot:
+                local_path = self._local_path(path)
+                if not os.path.exists(local_path):
+                    continue
+                with open(local_path, encoding="utf-8") as f:
+                    blob = repo.create_git_blob(f.read(), "utf-8")
+                elements.append(InputGitTreeElement(path, "100644", "blob", sha=blob.sha))
+
+        if elements:
+            names = ", ".join(os.path.splitext(os.path.basename(p))[0] for p in snapshot)
+            with stage("github.commit"):
+                tree = repo.create_git_tree(elements, parent.tree)
+                commit = repo.create_git_commit(f"Update data for {names}", tree, [parent])
+                ref.edit(commit.sha)
+        return len(elements)
+
+
+_syncer = None
+_syncer_lock = threading.Lock()
+
+
+def get_syncer(data_dir="data"):
+    """
+    プロセスで1つの同期スレッドを返す（secrets に GITHUB_TOKEN がなければ None）
+    設定（secrets.toml）:
+    - GITHUB_TOKEN: 必須
+    - GITHUB_REPO: リポジトリ名（既定 kaa266/baseball-app）
+    - GITHUB_SYNC_INTERVAL: まとめる間隔（秒）
+    - GITHUB_API_URL: API の URL（テスト用のローカルサーバーを指定できる）
+    - GITHUB_BRANCH: 保存先ブランチ（既定はリポジトリのデフォルト）
+    """
+    global _syncer
+    with _syncer_lock:
+        if _syncer is None:
+            import streamlit as st
+            try:
+                token = st.secrets["GITHUB_TOKEN"]
+            except (KeyError, FileNotFoundError):
+                return None
+            _syncer = GitHubSync(
+                token,
+                repo_name=st.secrets.get("GITHUB_REPO", DEFAULT_REPO),
+                data_dir=data_dir,
+                interval=st.secrets.get("GITHUB_SYNC_INTERVAL", DEFAULT_INTERVAL),
+                base_url=st.secrets.get("GITHUB_API_URL"),
+                branch=st.secrets.get("GITHUB_BRANCH"),
+            ).start()
+        return _syncer
+
+
+def show_sync_status(data_dir="data"):
+    """サイドバーに GitHub 同期の状態を表示する"""
+    import streamlit as st
+    syncer = get_syncer(data_dir)
+    if syncer is None:
+        return
+    status = syncer.status()
+    labels = {"idle": "✅ 同期済み", "pending": "⏳ 同期待ち", "syncing": "🔄 同期中", "error": "⚠️ 同期エラー"}
+    st.sidebar.markdown(f"**GitHub同期**: {labels[status['state']]}（未送信 {status['pending']} ファイル）")
+    if status["last_success"]:
+        st.sidebar.caption(f"最終同期: {status['last_success']}")
+    if status["last_error"]:
+        st.sidebar.caption(f"エラー: {status['last_error']}（リトライ {status['retries']} 回目）")
+    if status["pending"] and st.sidebar.button("今すぐ同期"):
+        syncer.flush()
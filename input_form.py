@@ -2,65 +2,14 @@ import streamlit as st
 import pandas as pd
 import os
 from datetime import datetime
-from github import Github
-from io import StringIO
+from storage import get_storage
+from timing import stage
+# 選択肢定義（入力フォーム・分析・保存形式で共通）
+from vocabulary import PITCH_TYPES, LOCATIONS, PITCH_COUNTS, BATTING_SIDES, RESULTS, MOTIONS, PICKOFF, FIELD_ZONES
 
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def save_to_github(df, pitcher_name):
-    """
-    DataFrame を GitHub に保存する関数
-    - 既存ファイルがあれば update_file
-    - なければ create_file
-    """
-    try:
-        GITHUB_TOKEN = st.secrets["GITHUB_TOKEN"]
-        REPO_NAME = "kaa266/baseball-app"  # 自分のリポジトリ名
-        FILE_PATH = f"data/{pitcher_name.strip()}.csv"  # 空白除去
-
-        g = Github(GITHUB_TOKEN)
-        repo = g.get_repo(REPO_NAME)
-
-        # 既存ファイルの sha を取得
-        try:
-            contents = repo.get_contents(FILE_PATH)
-            sha = contents.sha
-        except Exception:
-            sha = None  # ファイルが存在しない場合は None
-
-        # CSV を文字列化
-        from io import StringIO
-        csv_buffer = StringIO()
-        df.to_csv(csv_buffer, index=False, encoding="utf-8-sig")
-        csv_content = csv_buffer.getvalue()
-
-        # GitHub に保存
-        if sha:
-            repo.update_file(
-                path=FILE_PATH,
-                message=f"Update data for {pitcher_name}",
-                content=csv_content,
-                sha=sha
-            )
-        else:
-            repo.create_file(
-                path=FILE_PATH,
-                message=f"Create data for {pitcher_name}",
-                content=csv_content
-            )
-
-        st.success(f"GitHubにも {pitcher_name}.csv を保存しました ✅")
-
-    except Exception as e:
-        st.error(f"GitHub保存に失敗しました: {e}")
-
-    # フォーム送信フラグと rerun は最後に必ず呼ぶ
-    st.session_state["form_submitted"] = True
-    st.rerun()
-
-
-
 def show_input_form(DATA_DIR):
     st.header("⚾ 投球データ入力フォーム")
 
@@ -72,23 +21,27 @@ def show_input_form(DATA_DIR):
         st.info("分析だけ見る場合は上のボタンを押してください")
         return  # パスワードが違う場合は入力フォームを表示しない
 
+    # クイック入力: コード1行で1球を入れる（送信しても入力欄だけ更新する）
+    # 一括取り込み: スコアブック・他チームの表（CSV / Excel）をまとめて取り込む
+    mode = st.radio("入力モード", ["通常", "クイック入力", "一括取り込み"], horizontal=True, key="input_mode")
+    if mode == "クイック入力":
+        from fast_entry import show_fast_entry
+        show_fast_entry(DATA_DIR)
+        return
+    if mode == "一括取り込み":
+        from bulk_import import show_bulk_import
+        show_bulk_import(DATA_DIR)
+        return
 
     # 選択肢定義（ここを先に書く）
-    pitch_types = ["ストレート", "スライダー", "カーブ", "フォーク", "チェンジアップ", "ツーシーム", "カットボール", "シュート", "その他"]
-    locations = ["内角高め", "内角真ん中", "内角低め", "外角高め", "外角真ん中", "外角低め", "真ん中高め", "真ん中低め", "真ん中"]
-    pitch_counts = ["0", "1S ", "2S ", "1B ", "2B ", "3B ", "1B1S", "1B2S ","2B1S ","3B1S ", "2B2S ", "3B2S "]
-    batting_sides = ["右", "左"]
-    results = ["ストライク", "ボール", "ファール", "スイング", "見三振", "空三振", "四球", "死球",
-               "1ゴロ", "2ゴロ", "3ゴロ", "4ゴロ", "5ゴロ", "6ゴロ",
-               "1フライ", "2フライ", "3フライ", "4フライ", "5フライ", "6フライ", "7フライ", "8フライ", "9フライ",
-               "1ライナー", "2ライナー", "3ライナー", "4ライナー", "5ライナー", "6ライナー", "7ライナー", "8ライナー", "9ライナー",
-               "1ヒット", "2ヒット", "3ヒット", "4ヒット", "5ヒット", "6ヒット", "7ヒット", "8ヒット", "9ヒット",
-               "72B ", "82B ", "92B ", "73B ", "83B ", "93B ", "7HR ", "8HR ", "9HR ",
-               "1バント", "2バント", "3バント", "4バント", "5バント",
-               "1E ", "2E ", "3E ", "4E ", "5E ", "6E ", "7E ", "8E ", "9E "]
-    motions = [" ", "クイック"]
-    pickoff = [" ", "牽制"]
-    field_zones = ["なし", "レフト", "左中間", "センター", "右中間", "ライト", "サード","ショート", "セカンド", "ファースト"]
+    pitch_types = PITCH_TYPES
+    locations = LOCATIONS
+    pitch_counts = PITCH_COUNTS
+    batting_sides = BATTING_SIDES
+    results = RESULTS
+    motions = MOTIONS
+    pickoff = PICKOFF
+    field_zones = FIELD_ZONES
 
     # 🔁 初期化処理
     if st.session_state.get("form_submitted", False):
@@ -152,8 +105,8 @@ def show_input_form(DATA_DIR):
        
 
         selected_result = st.selectbox("🎯 結果（1つ選択）", results, key="result_select")
-        selected_motion = st.selectbox("モーション", motions, key="motion_select")
-        selected_pickoff = st.selectbox("牽制", pickoff, key="pickoff_select")
+        selected_motion = st.selectbox("モーション", motions, key="motion_select", format_func=lambda v: v or "なし")
+        selected_pickoff = st.selectbox("牽制", pickoff, key="pickoff_select", format_func=lambda v: v or "なし")
         selected_zone = st.selectbox("打球方向", field_zones, key="zone_select")
 
         submitted = st.form_submit_button("✅ データ送信")
@@ -186,22 +139,15 @@ def show_input_form(DATA_DIR):
             "打球方向": selected_zone
         }
 
-        filepath = os.path.join(DATA_DIR, f"{pitcher_name}.csv")
-        df_new = pd.DataFrame([data])
-        if os.path.exists(filepath):
-            df_existing = pd.read_csv(filepath)
-            df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-        else:
-            df_combined = df_new
-        df_combined.to_csv(filepath, index=False, encoding="utf-8-sig")
+        # 既存データは読み込まず、1球分だけ追加する（CSV なら末尾に1行追記・集計表にも1球分だけ足し込む）
+        with stage("input.save_pitch"):
+            get_storage(DATA_DIR).append_pitch(data)
 
         st.success(f"{pitcher_name} のデータを保存しました ✅")
 
-        df_combined.to_csv(filepath, index=False, encoding="utf-8-sig")
-
 # 保存したデータをアプリ内で確認
-        st.subheader(f"{pitcher_name} の保存済みデータ")
-        st.dataframe(df_combined)  # 表形式で確認できる
+        st.subheader(f"{pitcher_name} の保存データ")
+        st.dataframe(pd.DataFrame([data]))  # 今回追加した1球分
 
         # 🔁 初期化のためフラグ立てて rerun
         st.session_state["form_submitted"] = True
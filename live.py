@@ -0,0 +1,209 @@
+"""
+試合中のライブ表示
+- 一定間隔で投手のデータ（CSV / SQLite）を確認し、前回から追記された行だけを読む
+  - CSV: 前回読んだバイト位置から末尾まで / SQLite: 前回の最大 id より後の行
+- 追記分だけを集計して「今の試合」の集計表に足し込む（ファイル全体は読み直さない）
+  - 日付が変わるか GAME_GAP より空いたら新しい試合として数え直す（time_index と同じ区切り）
+- 図は、元になる数字が変わったものだけ描き直す（図ごとに版を持つ）
+- 状態（読んだ位置・集計表・描いた図）は投手ごとにプロセスで1つだけ持ち、全画面で共有する
+  （何台の画面で見ていても、追記分を読むのは間隔ごとに1回）
+- 画面は st.fragment(run_every=...) で、ライブ表示の部分だけを更新する
+"""
+import copy
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from aggregates import aggregate_frame, empty_aggregates, merge_aggregates
+from time_index import GAME_GAP, TIME_FORMAT
+from timing import stage
+from vocabulary import pitch_type_label
+
+INTERVALS = [2, 5, 10, 30, 60]  # 更新間隔の選択肢（秒）
+DEFAULT_INTERVAL = 5
+RECENT = 8                      # 直近の投球を何球表示するか
+
+# 図 → 元になる集計表の部分（この部分が変わったときだけ描き直す）
+CHARTS = {
+    "pitch_pie": ("pitch_type", None),
+    "count_bar": ("count_pitch", None),
+    "zone_right": ("zone", "右"),
+    "zone_left": ("zone", "左"),
+    "direction_right": ("direction", "右"),
+    "direction_left": ("direction", "左"),
+}
+
+
+def _changed_charts(part):
+    """追記分の集計表 part で数字が変わる図"""
+    changed = []
+    for chart, (section, side) in CHARTS.items():
+        values = part[section] if side is None else part[section].get(side)
+        if values:
+            changed.append(chart)
+    return changed
+
+
+class LiveGame:
+    """
+    1人の投手の「今の試合」
+    - refresh() で追記分だけを読んで集計表に足し込む
+    - 集計表は足し込むたびに新しい dict にするので、読む側はロックなしで使える
+    """
+
+    def __init__(self, storage, pitcher):
+        self.storage = storage
+        self.pitcher = pitcher
+        self._lock = threading.Lock()
+        self._images = {}   # 図 → (版, PNG)
+        self.checked = None  # 最後に確認した時刻（time.monotonic）
+        self._reset()
+
+    def _reset(self):
+        self.cursor = self.storage.tail_start(self.pitcher)
+        self.agg = empty_aggregates()
+        self.game_start = None  # 試合開始時刻（Timestamp）
+        self.last_time = None   # 最後の投球の時刻（Timestamp）
+        self.recent = pd.DataFrame()
+        self.revisions = dict.fromkeys(CHARTS, 0)
+        self.updated = None     # 最後に投球が増えた時刻
+
+    def refresh(self, max_age):
+        """前回の確認から max_age 秒以上たっていれば追記分を読む（何画面から呼ばれても読むのは1回）"""
+        with self._lock:
+            now = time.monotonic()
+            if self.checked is not None and now - self.checked < max_age:
+                return
+            self.checked = now
+            with stage("live.read_new"):
+                df, cursor = self.storage.read_new(self.pitcher, self.cursor)
+                if df is None:  # ファイルが書き換えられた → 試合の先頭から読み直す
+                    self._reset()
+                    df, cursor = self.storage.read_new(self.pitcher, self.cursor)
+            self.cursor = cursor
+            if len(df):
+                with stage("live.fold"):
+                    self._fold(df)
+
+    def _fold(self, df):
+        """追記分を今の試合の集計表に足し込む（新しい試合が始まっていれば数え直す）"""
+        times = pd.to_datetime(df["日時"], format=TIME_FORMAT, errors="coerce").reset_index(drop=True)
+        df = df.reset_index(drop=True)
+        latest = times.cummax()
+        if self.last_time is not None:
+            latest = latest.clip(lower=self.last_time)
+        prev = latest.shift()
+        prev.iloc[0] = self.last_time if self.last_time is not None else pd.NaT
+        # 新しい試合は時刻が進んだときだけ（後から取り込んだ過去の投球では区切らない）
+        new_game = times.notna() & (prev.isna() | ((times > prev) & (
+            (times.dt.normalize() != prev.dt.normalize()) | (times - prev > GAME_GAP))))
+        starts = new_game[new_game].index
+        if len(starts):
+            first = starts[-1]
+            self.agg = empty_aggregates()
+            self.recent = pd.DataFrame()
+            self.game_start = times[first]
+            self.revisions = {chart: n + 1 for chart, n in self.revisions.items()}
+            df, times = df.iloc[first:], times.iloc[first:]
+        # この試合より前の時刻の行（過去の投球の取り込み）は数えない
+        rows = df[~(times < self.game_start).to_numpy()] if self.game_start is not None else df
+        if latest.notna().any():
+            self.last_time = latest.iloc[-1]
+        if rows.empty:
+            return
+
+        part = aggregate_frame(rows)
+        self.agg = merge_aggregates(copy.deepcopy(self.agg), part)
+        for chart in _changed_charts(part):
+            self.revisions[chart] += 1
+        self.recent = (pd.concat([self.recent, rows]) if len(self.recent) else rows).tail(RECENT)
+        self.updated = datetime.now()
+
+    def image(self, chart, render):
+        """図の PNG（数字が変わっていなければ前回描いたものをそのまま返す）"""
+        revision = self.revisions[chart]
+        cached = self._images.get(chart)
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+        png = render()
+        self._images[chart] = (revision, png)
+        return png
+
+
+_games = {}
+_games_lock = threading.Lock()
+
+
+def get_game(storage, pitcher):
+    """投手のライブ状態（プロセスで1つ）"""
+    key = (storage.name, storage.data_dir, pitcher)
+    with _games_lock:
+        game = _games.get(key)
+        if game is None:
+            game = _games[key] = LiveGame(storage, pitcher)
+        return game
+
+
+def recent_table(recent):
+    """直近の投球（新しい順）"""
+    table = pd.DataFrame({
+        "Time": recent["日時"].str[11:],
+        "Pitch": recent["球種"].map(pitch_type_label),
+        "Speed": recent["球速"],
+        "Count": recent["カウント"],
+        "Batter": recent["打者左右"],
+        "Result": recent["結果"],
+    })
+    return table.iloc[::-1]
+
+
+def _show_live_panel(storage, pitcher, interval):
+    from analysis import (count_pitch_percentages, count_pitch_types, create_zone_matrix,
+                          direction_percentages, has_field_image, render_count_bar, render_direction,
+                          render_pitch_pie, render_zone_heatmap, zone_counts)
+
+    game = get_game(storage, pitcher)
+    game.refresh(interval)
+    agg = game.agg
+    if game.game_start is None or agg["rows"] == 0:
+        st.info("Waiting for the first pitch of the game...")
+        return
+
+    updated = f", updated {game.updated:%H:%M:%S}" if game.updated else ""
+    st.caption(f"Game started {game.game_start:%Y-%m-%d %H:%M} · {agg['rows']} pitches{updated}")
+    st.dataframe(recent_table(game.recent), hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Pitch Type Distribution")
+        st.image(game.image("pitch_pie", lambda: render_pitch_pie(count_pitch_types(agg))), width="stretch")
+    with col2:
+        st.subheader("Count-based Pitch %")
+        if agg["count_pitch"]:
+            st.image(game.image("count_bar", lambda: render_count_bar(count_pitch_percentages(agg))),
+                     width="stretch")
+
+    col1, col2 = st.columns(2)
+    for col, side, name, cmap in [(col1, "右", "right", "Reds"), (col2, "左", "left", "Blues")]:
+        title = "Right-handed Batters" if side == "右" else "Left-handed Batters"
+        with col:
+            st.subheader(title)
+            if agg["zone"].get(side):
+                st.image(game.image(f"zone_{name}", lambda: render_zone_heatmap(
+                    create_zone_matrix(zone_counts(agg, side), batter_side=side), cmap, title)), width="stretch")
+            if agg["direction"].get(side) and has_field_image():
+                st.image(game.image(f"direction_{name}", lambda: render_direction(
+                    direction_percentages(agg, side), title.split()[0])), width="stretch")
+
+
+def show_live(storage, pitchers):
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        pitcher = st.selectbox("Select Pitcher", pitchers, key="live_pitcher")
+    with col2:
+        interval = st.select_slider("Refresh every (s)", INTERVALS, value=DEFAULT_INTERVAL, key="live_interval")
+    # ライブ表示の部分だけを interval 秒ごとに再実行する（ページ全体は再実行しない）
+    st.fragment(_show_live_panel, run_every=interval)(storage, pitcher, interval)
@@ -0,0 +1,258 @@
+"""
+結果（ヒット・ゴロ・フライ・三振・四球など）の分析
+- 球種・コース・カウント・打者左右・モーション・牽制 の組み合わせごとに、結果の件数をまとめた表（キューブ）を作る
+  - 結果の値は「ボール」「空振り」「ゴロ」「ヒット」などの分類に分けて数える（1つの結果が複数の分類に入る）
+  - キューブはデータの版ごとに1回だけ作り、共有キャッシュに置く（SQLite は GROUP BY で数える）
+- 絞り込み・内訳・コース別の割合は、キューブ（数千行以下）を足し合わせるだけで出す（生データは読み直さない）
+- 割合の定義
+  - Hit% / K% / BB%: 打席（打球・三振・四死球）あたり
+  - Whiff%: スイング（空振り・ファール・打球）あたりの空振り
+  - GB%: 打球あたりのゴロ
+  - Strike%: 投球あたりのストライク（見逃し・空振り・ファール・打球）
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import shared_cache
+from storage import cached
+from timing import stage
+from vocabulary import VOCABULARY, pitch_type_label
+
+# キューブの軸
+DIMENSIONS = ["球種", "コース", "カウント", "打者左右", "モーション", "牽制"]
+DIMENSION_LABELS = {"球種": "Pitch type", "コース": "Zone", "カウント": "Count", "打者左右": "Batter",
+                    "モーション": "Motion", "牽制": "Pickoff"}
+
+# 結果の分類
+OUTCOMES = ["ball", "called", "whiff", "foul", "in_play", "hit", "ground", "fly", "liner", "bunt", "error",
+            "strikeout", "walk", "hbp"]
+COUNT_COLUMNS = ["pitches"] + OUTCOMES
+
+# 結果 → 分類（そのままの値）
+EXACT_OUTCOMES = {
+    "ボール": ("ball",),
+    "ストライク": ("called",),
+    "スイング": ("whiff",),
+    "ファール": ("foul",),
+    "見三振": ("called", "strikeout"),
+    "空三振": ("whiff", "strikeout"),
+    "四球": ("ball", "walk"),
+    "死球": ("hbp",),
+}
+# 結果 → 分類（打球は "6ゴロ"・"72B" のように守備位置 + 種類なので、末尾で分ける）
+SUFFIX_OUTCOMES = {
+    "ゴロ": ("in_play", "ground"),
+    "フライ": ("in_play", "fly"),
+    "ライナー": ("in_play", "liner"),
+    "ヒット": ("in_play", "hit"),
+    "2B": ("in_play", "hit"),
+    "3B": ("in_play", "hit"),
+    "HR": ("in_play", "hit"),
+    "バント": ("in_play", "bunt"),
+    "E": ("in_play", "error"),
+}
+
+# 割合 → (分子, 分母)
+RATES = {
+    "Hit%": ("hit", "pa"),
+    "K%": ("strikeout", "pa"),
+    "BB%": ("walk", "pa"),
+    "Whiff%": ("whiff", "swings"),
+    "GB%": ("ground", "in_play"),
+    "Strike%": ("strikes", "pitches"),
+}
+
+
+def classify(result):
+    """結果1つの分類（どれにも当たらなければ空）"""
+    if result in EXACT_OUTCOMES:
+        return EXACT_OUTCOMES[result]
+    for suffix, outcomes in SUFFIX_OUTCOMES.items():
+        if isinstance(result, str) and result.endswith(suffix):
+            return outcomes
+    return ()
+
+
+def outcome_flags(results):
+    """結果の列を分類ごとの 0/1 の表にする（値の種類ごとに1回だけ分類する）"""
+    codes, uniques = pd.factorize(results)
+    table = np.zeros((len(uniques) + 1, len(OUTCOMES)), dtype="int64")  # 最後の行は欠損（codes = -1）
+    for i, value in enumerate(uniques):
+        for outcome in classify(value):
+            table[i, OUTCOMES.index(outcome)] = 1
+    return pd.DataFrame(table[codes], columns=OUTCOMES)
+
+
+def _dimension_values(series):
+    """軸の値を文字列にそろえる（欠損・空は ""。モーション・牽制の「なし」と同じ）"""
+    values = series.astype(object)
+    return values.where(values.notna(), "").astype(str)
+
+
+def _group(frame):
+    """軸ごとに件数を合計してキューブにする（軸はカテゴリ型。絞り込みが速い）"""
+    cube = frame.groupby(DIMENSIONS, sort=False)[COUNT_COLUMNS].sum().reset_index()
+    return cube.astype({dim: "category" for dim in DIMENSIONS})
+
+
+def build_cube(counts):
+    """
+    組み合わせごとの投球数（storage.count_by の DIMENSIONS + 結果 + 件数）からキューブを作る
+    戻り値: DIMENSIONS + pitches + OUTCOMES の DataFrame（1行 = 軸の値の1つの組み合わせ）
+    """
+    with stage("outcomes.build_cube"):
+        counts = counts.reset_index(drop=True)
+        weights = counts["件数"].to_numpy(dtype="int64")
+        frame = outcome_flags(counts["結果"]).mul(weights, axis=0)
+        frame.insert(0, "pitches", weights)
+        for dim in DIMENSIONS:
+            frame[dim] = _dimension_values(counts[dim])
+        return _group(frame)
+
+
+def combine_cubes(cubes):
+    """複数投手のキューブを合算する"""
+    cubes = [cube.astype({dim: object for dim in DIMENSIONS}) for cube in cubes if not cube.empty]
+    if not cubes:
+        return build_cube(pd.DataFrame(columns=DIMENSIONS + ["結果", "件数"]))
+    return _group(pd.concat(cubes, ignore_index=True))
+
+
+def load_cube(storage, pitcher):
+    """投手のキューブ（共有キャッシュ。書き換えないこと）"""
+    return cached(storage, "outcome_cube", pitcher,
+                  lambda: build_cube(storage.count_by(pitcher, DIMENSIONS + ["結果"])))
+
+
+def load_team_cube(storage, pitchers):
+    """
+    全投手を合算したキューブ（共有キャッシュ。書き換えないこと）
+    - 版は全投手の版の組（誰かが保存したら作り直す）
+    """
+    versions = tuple(storage.version(p) for p in pitchers)
+    return shared_cache.get(f"{storage.name}.outcome_cube", (storage.data_dir, None), tuple(pitchers), versions,
+                            lambda: combine_cubes([load_cube(storage, p) for p in pitchers]))
+
+
+def filter_cube(cube, filters):
+    """filters（軸 → 選んだ値のリスト。空なら絞り込まない）に当てはまる行だけにする"""
+    mask = np.ones(len(cube), dtype=bool)
+    for dim, values in filters.items():
+        if values:
+            mask &= cube[dim].isin(values).to_numpy()
+    return cube[mask]
+
+
+def with_rates(counts):
+    """
+    件数の表（行ごと）に打席数などと割合（%）を足す
+    - 分母が 0 の割合は NaN
+    - 列ごとに NumPy で計算し、DataFrame は最後に1回だけ作る（絞り込みのたびに呼ぶので）
+    """
+    columns = {name: counts[name].to_numpy() for name in COUNT_COLUMNS}
+    columns["swings"] = columns["whiff"] + columns["foul"] + columns["in_play"]
+    columns["pa"] = columns["in_play"] + columns["strikeout"] + columns["walk"] + columns["hbp"]
+    columns["strikes"] = columns["called"] + columns["whiff"] + columns["foul"] + columns["in_play"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for rate, (numerator, denominator) in RATES.items():
+            den = columns[denominator]
+            columns[rate] = np.where(den > 0, columns[numerator] / den * 100, np.nan)
+    return pd.DataFrame(columns, index=counts.index)
+
+
+def totals(cube):
+    """キューブ全体の件数と割合（Series）"""
+    return with_rates(cube[COUNT_COLUMNS].sum().to_frame().T).iloc[0]
+
+
+def _sum_by(cube, dim):
+    """軸 dim の値ごとの件数の合計（カテゴリのコードを np.bincount で数える。groupby より速い）"""
+    categories = cube[dim].cat.categories
+    codes = cube[dim].cat.codes.to_numpy()
+    sums = {name: np.bincount(codes, weights=cube[name].to_numpy(), minlength=len(categories)).astype("int64")
+            for name in COUNT_COLUMNS}
+    table = pd.DataFrame(sums, index=categories)
+    return table[table["pitches"].to_numpy() > 0]
+
+
+def breakdown(cube, dim):
+    """軸 dim の値ごとの投球数・打席数と割合（%）の表"""
+    table = with_rates(_sum_by(cube, dim))[["pitches", "pa"] + list(RATES)]
+    table = table.rename(columns={"pitches": "Pitches", "pa": "PA"})
+    table.index = [_value_label(dim, value) for value in table.index]
+    table.index.name = DIMENSION_LABELS[dim]
+    return table
+
+
+def zone_rates(cube, batter_side, rate):
+    """打者の左右ごとのコース別の割合（%。create_zone_matrix にそのまま渡せる）"""
+    from analysis import zones
+    side = cube[(cube["打者左右"] == batter_side).to_numpy()]
+    counts = _sum_by(side, "コース").reindex(zones, fill_value=0)
+    return with_rates(counts)[rate]
+
+
+def _value_label(dim, value):
+    if value == "":
+        return "(none)"
+    return pitch_type_label(value) if dim == "球種" else value
+
+
+def _options(cube, dim):
+    """絞り込みの選択肢（語彙の順。語彙にない値は後ろに）"""
+    present = set(cube[dim].cat.categories)
+    order = VOCABULARY.get(dim, [])
+    return [v for v in order if v in present] + sorted(present - set(order))
+
+
+def _format_rate(value):
+    return "-" if pd.isna(value) else f"{value:.1f}%"
+
+
+def show_outcomes(storage, pitchers):
+    from analysis import create_zone_matrix, render_zone_heatmap
+
+    pitcher = st.selectbox("Select Pitcher", [None] + pitchers, key="out_pitcher",
+                           format_func=lambda p: "All pitchers" if p is None else p)
+    with stage("outcomes.load"):
+        cube = load_team_cube(storage, pitchers) if pitcher is None else load_cube(storage, pitcher)
+    if cube.empty:
+        st.info("No data available for this pitcher yet.")
+        return
+
+    filters = {}
+    columns = st.columns(3)
+    for i, dim in enumerate(DIMENSIONS):
+        with columns[i % 3]:
+            filters[dim] = st.multiselect(DIMENSION_LABELS[dim], _options(cube, dim), key=f"out_{dim}",
+                                          format_func=lambda v, dim=dim: _value_label(dim, v), placeholder="All")
+
+    with stage("outcomes.query"):
+        selected = filter_cube(cube, filters)
+        total = totals(selected)
+    st.caption(f"{int(total['pitches'])} pitches, {int(total['pa'])} plate appearances")
+    for column, rate in zip(st.columns(len(RATES)), RATES):
+        column.metric(rate, _format_rate(total[rate]))
+
+    st.title("📋 Outcome Rates")
+    by = st.selectbox("Break down by", DIMENSIONS, key="out_by", format_func=DIMENSION_LABELS.get)
+    table = breakdown(selected, by)
+    st.dataframe(table.style.format({rate: _format_rate for rate in RATES}))
+
+    st.title("📊 Outcome Rate Heatmap (Pitcher Perspective)")
+    rate = st.selectbox("Rate", list(RATES), key="out_rate")
+    col1, col2 = st.columns(2)
+    for col, side, cmap, title in [(col1, "右", "Reds", "Right-handed Batters"),
+                                   (col2, "左", "Blues", "Left-handed Batters")]:
+        with col:
+            st.subheader(title)
+            values = zone_rates(selected, side, rate)
+            if values.isna().all():
+                st.info("No data for this filter.")
+                continue
+            mat = create_zone_matrix(values, batter_side=side)
+            st.image(render_zone_heatmap(mat, cmap, f"{rate} vs {title}"), width="stretch")
+
+    st.caption("Hit%, K%, BB%: per plate appearance · Whiff%: misses per swing · "
+               "GB%: ground balls per ball in play · Strike%: called, swinging, foul or in play")
@@ -0,0 +1,34 @@
+import os
+
+import pandas as pd
+
+import shared_cache
+from timing import stage
+
+
+def use_columnar():
+    """環境変数 PITCH_STORAGE=parquet なら Parquet（列指向）から読む"""
+    return os.environ.get("PITCH_STORAGE", "csv").lower() == "parquet"
+
+
+def _read(path):
+    with stage("data.read"):
+        if use_columnar():
+            from columnar_store import read_pitches
+            return read_pitches(path)
+        return pd.read_csv(path)
+
+
+def load_pitcher_data(path):
+    """
+    投手のCSVを読み込んだ DataFrame を返す
+    - 値は保存時に正規の表記にそろえてある（vocabulary.py）ので、読み込み後の整形はしない
+    - ファイルのサイズと更新時刻が変わっていなければ、前回の結果をそのまま返す
+      （プロセス全体の共有キャッシュ。全セッションで同じ DataFrame を使う）
+    - 返した DataFrame はキャッシュと共有しているので書き換えないこと
+    """
+    st_result = os.stat(path)
+    data_dir, name = os.path.split(path)
+    owner = (data_dir, os.path.splitext(name)[0])
+    version = (st_result.st_size, st_result.st_mtime_ns)
+    return shared_cache.get("pitches", owner, (use_columnar(),), version, lambda: _read(path))
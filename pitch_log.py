@@ -0,0 +1,97 @@
+import csv
+import io
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl  # Linux / macOS
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 投球データ CSV の列（この順番でファイルに書き込む）
+COLUMNS = ["日時", "投手名", "球速", "球種", "コース", "カウント", "打者左右", "結果", "モーション", "牽制", "打球方向"]
+
+
+@contextmanager
+def locked(f):
+    """
+    開いているファイルに排他ロックをかける
+    - 同じ投手を2人が同時に入力しても行が混ざらないようにする
+    """
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield f
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        # msvcrt はファイル先頭の1バイトをロックする
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield f
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def header_size(filepath):
+    """ヘッダー行（BOM・改行を含む）のバイト数"""
+    with open(filepath, "rb") as f:
+        return len(f.readline())
+
+
+def format_row(data):
+    """1行分の dict を CSV の1行（改行付き）に変換する"""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(["" if data.get(col) is None else data.get(col) for col in COLUMNS])
+    return buf.getvalue()
+
+
+def format_rows(df):
+    """DataFrame（列は COLUMNS）を CSV の行（改行付き）をつなげた文字列に変換する（欠損は空欄）"""
+    return df.reindex(columns=COLUMNS).to_csv(header=False, index=False, lineterminator="\n")
+
+
+def append_pitch(filepath, data, after_write=None):
+    """
+    1球分のデータをCSVの末尾に追記する
+    - ファイル全体は読み込まない（何行あっても同じ時間で保存できる）
+    - ヘッダーと BOM はファイル新規作成時だけ書く
+    - 書き込み中は排他ロックをかける
+    - after_write(start, end, mtime_ns) はロックを持ったまま呼ぶ（集計の更新などを行と同時に確定させる）
+      mtime_ns は追記する前の CSV の更新時刻（新しく作ったファイルなら None）。
+      集計表などが追記前の CSV から作られたものか（同じサイズのまま書き換えられていないか）の確認に使う
+    戻り値: 追記した行の先頭バイト位置
+    """
+    return append_rows(filepath, format_row(data).encode("utf-8"), after_write)
+
+
+def append_rows(filepath, lines, after_write=None):
+    """
+    CSV の行（bytes、改行で終わる）をまとめて末尾に追記する（一括取り込み用。1回の書き込み）
+    - ロック・ヘッダー・after_write の扱いは append_pitch と同じ
+    戻り値: 追記した行の先頭バイト位置
+    """
+    # "a+b" なら存在しなければ作成、書き込みは常に末尾
+    with open(filepath, "a+b") as f:
+        with locked(f):
+            f.seek(0, os.SEEK_END)
+            mtime_ns = os.fstat(f.fileno()).st_mtime_ns if f.tell() else None
+            if f.tell() == 0:
+                header = "\ufeff" + ",".join(COLUMNS) + "\n"
+                f.write(header.encode("utf-8"))
+            else:
+                # 最終行が改行で終わっていなければ補う
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            offset = f.tell()
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+            if after_write is not None:
+                after_write(offset, offset + len(lines), mtime_ns)
+    return offset
@@ -0,0 +1,194 @@
+"""
+PDF レポートのバックグラウンド作成
+- レポートはプロセスプールで作るので、作成中も画面は止まらない
+- 全投手（または選んだ投手）のレポートを並列に作り、1つの zip にまとめられる
+- 作ったレポートは集計データのハッシュをキーにディスクに保存し、データが同じなら作り直さない
+
+レポートは data/reports/ に置く。
+コマンドラインから: python reports.py [--data-dir data] [--out reports.zip] [投手名 ...]
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from figure_cache import make_key
+from storage import get_storage
+
+REPORT_DIR = "reports"  # data/ の下に置く
+
+
+def report_path(storage, pitcher):
+    """集計データが同じなら同じパスになる（パスがあれば作成済み）"""
+    key = make_key("report", storage.load_aggregates(pitcher))[:16]
+    return os.path.join(storage.data_dir, REPORT_DIR, f"{pitcher}-{key}.pdf")
+
+
+def build_report(storage, pitcher):
+    """
+    1人分のレポートを作ってファイルに保存する（ワーカープロセスで実行）
+    戻り値: PDF のパス
+    """
+    path = report_path(storage, pitcher)
+    if os.path.exists(path):
+        return path
+
+    from analysis import (
+        create_pdf, create_zone_matrix, count_pitch_types, count_pitch_percentages, zone_counts,
+        direction_percentages, render_pitch_pie, render_count_bar, render_zone_heatmap, render_direction,
+    )
+    agg = storage.load_aggregates(pitcher)
+    images = [render_pitch_pie(count_pitch_types(agg))]
+    if agg["count_pitch"]:
+        images.append(render_count_bar(count_pitch_percentages(agg)))
+    if agg["zone"]:
+        images.append(render_zone_heatmap(create_zone_matrix(zone_counts(agg, "右"), batter_side="右"),
+                                          "Reds", "Right-handed Batters"))
+        images.append(render_zone_heatmap(create_zone_matrix(zone_counts(agg, "左"), batter_side="左"),
+                                          "Blues", "Left-handed Batters"))
+    if agg["direction"]:
+        images.append(render_direction(direction_percentages(agg, "右"), "Right-handed"))
+        images.append(render_direction(direction_percentages(agg, "左"), "Left-handed"))
+
+    pdf = create_pdf(images, title=f"{pitcher} 投手分析レポート").getvalue()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 同じ投手の古いレポートは消す
+    prefix = f"{pitcher}-"
+    for old in os.listdir(os.path.dirname(path)):
+        if old.startswith(prefix) and old.endswith(".pdf") and len(old) == len(os.path.basename(path)):
+            os.remove(os.path.join(os.path.dirname(path), old))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(pdf)
+    os.replace(tmp, path)
+    return path
+
+
+def pack_zip(paths):
+    """{投手名: PDF のパス} を1つの zip（バイト列）にまとめる"""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for pitcher, path in sorted(paths.items()):
+            zf.write(path, arcname=f"{pitcher}_analysis.pdf")
+    return buffer.getvalue()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """プロセスで1つのプロセスプール（Streamlit のスレッドを fork しないよう spawn で起動）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+class ReportJob:
+    """
+    複数投手のレポート作成ジョブ
+    - 作成済み（キャッシュあり）の投手はプールに投げずにすぐ完了にする
+    """
+
+    def __init__(self, storage, pitchers):
+        self.pitchers = list(pitchers)
+        self.paths = {}
+        self.errors = {}
+        self._futures = {}
+        for pitcher in self.pitchers:
+            cached = report_path(storage, pitcher)
+            if os.path.exists(cached):
+                self.paths[pitcher] = cached
+            else:
+                self._futures[pitcher] = get_pool().submit(build_report, storage, pitcher)
+
+    def _collect(self):
+        for pitcher, future in list(self._futures.items()):
+            if future.done():
+                del self._futures[pitcher]
+                try:
+                    self.paths[pitcher] = future.result()
+                except Exception as e:
+                    self.errors[pitcher] = str(e)
+
+    def progress(self):
+        """(完了数, 全体数)"""
+        self._collect()
+        return len(self.paths) + len(self.errors), len(self.pitchers)
+
+    def done(self):
+        finished, total = self.progress()
+        return finished == total
+
+    def wait(self):
+        for future in list(self._futures.values()):
+            future.exception()
+        self._collect()
+
+
+def show_report_job(job_name, storage, pitchers, label, file_name):
+    """
+    レポート作成ボタン・進捗バー・ダウンロードボタンを表示する
+    - 作成中は1秒ごとにこの部分だけ再実行して進捗を更新する
+    """
+    import streamlit as st
+
+    jobs = st.session_state.setdefault("report_jobs", {})
+    if st.button(label, key=f"{job_name}_start"):
+        jobs[job_name] = ReportJob(storage, pitchers)
+
+    job = jobs.get(job_name)
+    if job is None:
+        return
+
+    def _poll():
+        finished, total = job.progress()
+        if finished < total:
+            st.progress(finished / total, text=f"PDF作成中… {finished}/{total}")
+        else:
+            st.rerun()  # 完了したら画面全体を更新してダウンロードボタンを出す
+
+    if not job.done():
+        st.fragment(_poll, run_every=1.0)()
+        return
+
+    for pitcher, error in job.errors.items():
+        st.error(f"{pitcher}: PDF作成に失敗しました: {error}")
+    if not job.paths:
+        return
+    if len(job.pitchers) == 1:
+        path = next(iter(job.paths.values()))
+        with open(path, "rb") as f:
+            data, mime = f.read(), "application/pdf"
+    else:
+        data, mime = pack_zip(job.paths), "application/zip"
+    st.download_button(label="📥 ダウンロード", data=data, file_name=file_name, mime=mime,
+                       key=f"{job_name}_download")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全投手（または指定した投手）の PDF レポートを作って zip にまとめる")
+    parser.add_argument("pitchers", nargs="*", help="投手名（省略すると全員）")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--out", default="reports.zip")
+    args = parser.parse_args()
+
+    storage = get_storage(args.data_dir)
+    job = ReportJob(storage, args.pitchers or storage.pitchers())
+    job.wait()
+    for pitcher, error in job.errors.items():
+        print(f"{pitcher}: {error}")
+    with open(args.out, "wb") as f:
+        f.write(pack_zip(job.paths))
+    print(f"{len(job.paths)} reports -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
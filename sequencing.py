@@ -0,0 +1,169 @@
+"""
+配球（投球の順番）の分析
+- 日時順に並べ、カウントが "0" に戻ったところで打席を区切る
+- 同じ打席内の「前の球 → 次の球」の遷移（前の球種ごとに、次に何を投げたか）
+- よく出る2球・3球の組み合わせ
+- カウント別・打者の左右別に絞り込める
+- 球種を整数コードにして NumPy でまとめて数える（行ごとの Python ループはしない）
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from storage import cached
+from timing import stage
+from vocabulary import PITCH_COUNTS, pitch_type_label
+
+TOP_N = 10
+ARROW = " → "
+
+
+def at_bats(df):
+    """
+    投球を日時順に並べ、打席に区切る（元の DataFrame は書き換えない）
+    戻り値: 日時・球種・カウント・打者左右・打席（通し番号）・球数（打席内の何球目か）の DataFrame
+    """
+    seq = df[["日時", "球種", "カウント", "打者左右"]]
+    if not seq["日時"].is_monotonic_increasing:
+        # 追記順（= 日時順）のままなら並べ替えない。"%Y-%m-%d %H:%M:%S" は文字列の順が日時の順
+        order = np.argsort(pd.to_datetime(seq["日時"], errors="coerce").to_numpy(), kind="stable")
+        seq = seq.iloc[order]
+    seq = seq.reset_index(drop=True)
+
+    n = len(seq)
+    new = _equals(seq["カウント"], "0")
+    if n:
+        new[0] = True
+    position = np.arange(n)
+    first = np.maximum.accumulate(np.where(new, position, 0))
+    return seq.assign(打席=np.cumsum(new) - 1, 球数=position - first + 1)
+
+
+def _equals(series, value):
+    """series == value の bool 配列（欠損は False）"""
+    return (series == value).to_numpy(dtype=bool, na_value=False, copy=True)
+
+
+def _pitch_codes(seq):
+    """球種を整数コード（欠損は -1）にし、コード → 英語名の配列と一緒に返す"""
+    codes, uniques = pd.factorize(seq["球種"])
+    labels = np.array([pitch_type_label(u) for u in uniques], dtype=object)
+    return codes, labels
+
+
+def _filter(seq, mask, start, count, side):
+    """組み合わせの start 球目のカウント・打者の左右で絞り込む"""
+    stop = start + len(mask)
+    if count is not None:
+        mask &= _equals(seq["カウント"], count)[start:stop]
+    if side is not None:
+        mask &= _equals(seq["打者左右"], side)[start:stop]
+    return mask
+
+
+def transition_counts(seq, count=None, side=None):
+    """
+    前の球種 → 次の球種の回数（行: 前の球種、列: 次の球種。英語名）
+    - 同じ打席内で続けて投げた2球だけを数える
+    - count / side を指定すると、次の球を投げたときのカウント・打者の左右で絞り込む
+    """
+    codes, labels = _pitch_codes(seq)
+    k = len(labels)
+    if k == 0 or len(codes) < 2:
+        return pd.DataFrame()
+    at_bat = seq["打席"].to_numpy()
+    prev, nxt = codes[:-1], codes[1:]
+    mask = (at_bat[:-1] == at_bat[1:]) & (prev >= 0) & (nxt >= 0)
+    mask = _filter(seq, mask, 1, count, side)
+
+    matrix = np.bincount(prev[mask] * k + nxt[mask], minlength=k * k).reshape(k, k)
+    table = pd.DataFrame(matrix, index=labels, columns=labels)
+    # 別々の表記が同じ英語名になる場合はまとめる
+    table = table.groupby(level=0).sum().T.groupby(level=0).sum().T
+    table = table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+    table.index.name = "Previous"
+    table.columns.name = "Next"
+    return table
+
+
+def transition_percentages(table):
+    """遷移の回数を、前の球種ごとの割合（%）にする"""
+    return (table.T / table.sum(axis=1)).T.mul(100).round(1)
+
+
+def common_sequences(seq, length, count=None, side=None, top=TOP_N):
+    """
+    同じ打席内で続けて投げた length 球の組み合わせのうち、多いものから top 件
+    - count / side は組み合わせの1球目のカウント・打者の左右で絞り込む
+    戻り値: Sequence（"Fastball → Slider" など）・Count・Share（%）の DataFrame
+    """
+    empty = pd.DataFrame(columns=["Sequence", "Count", "Share"])
+    codes, labels = _pitch_codes(seq)
+    k = len(labels)
+    n = len(codes) - length + 1
+    if k == 0 or n <= 0:
+        return empty
+    at_bat = seq["打席"].to_numpy()
+    # 打席は連続した番号なので、両端が同じ打席なら間の球も同じ打席
+    mask = at_bat[:n] == at_bat[length - 1:]
+    key = np.zeros(n, dtype=np.int64)
+    for i in range(length):  # 組み合わせの何球目か（2〜3回）のループで、行のループではない
+        part = codes[i:i + n]
+        mask &= part >= 0
+        key = key * k + part
+    mask = _filter(seq, mask, 0, count, side)
+
+    keys, counts = np.unique(key[mask], return_counts=True)
+    if not len(keys):
+        return empty
+    top_index = np.argsort(-counts, kind="stable")[:top]
+    keys, top_counts = keys[top_index], counts[top_index]
+    digits = [(keys // k ** (length - 1 - i)) % k for i in range(length)]
+    names = labels[digits[0]]
+    for d in digits[1:]:
+        names = names + ARROW + labels[d]
+    return pd.DataFrame({
+        "Sequence": names,
+        "Count": top_counts,
+        "Share": (top_counts / counts.sum() * 100).round(1),
+    })
+
+
+def show_sequencing(storage, pitchers):
+    pitcher = st.selectbox("Select Pitcher", pitchers, key="seq_pitcher")
+    with stage("sequencing.load"):
+        # 打席に区切った結果も共有キャッシュに置く（同じ投手を見ている全員で使い回す）
+        seq = cached(storage, "at_bats", pitcher, lambda: at_bats(storage.load_pitches(pitcher)))
+    if seq.empty:
+        st.info("No data available for this pitcher yet.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        side = st.radio("Batter", [None, "右", "左"], horizontal=True, key="seq_side",
+                        format_func=lambda s: {None: "All", "右": "Right-handed", "左": "Left-handed"}[s])
+    with col2:
+        count = st.selectbox("Count", [None] + PITCH_COUNTS, key="seq_count",
+                             format_func=lambda c: "All" if c is None else c)
+    st.caption(f"{int(seq['打席'].iloc[-1]) + 1} at-bats, {len(seq)} pitches")
+
+    st.title("🔁 Next Pitch by Previous Pitch")
+    with stage("sequencing.transitions"):
+        table = transition_counts(seq, count, side)
+    if table.empty:
+        st.info("No consecutive pitches for this filter.")
+    else:
+        st.caption("Rows: previous pitch, columns: next pitch (% of row)")
+        st.dataframe(transition_percentages(table).style.format("{:.1f}%"))
+
+    st.title("🔗 Common Sequences")
+    with stage("sequencing.sequences"):
+        pairs = common_sequences(seq, 2, count, side)
+        triples = common_sequences(seq, 3, count, side)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("2-pitch")
+        st.dataframe(pairs.style.format({"Share": "{:.1f}%"}), hide_index=True)
+    with col2:
+        st.subheader("3-pitch")
+        st.dataframe(triples.style.format({"Share": "{:.1f}%"}), hide_index=True)
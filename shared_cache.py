@@ -0,0 +1,175 @@
+"""
+プロセス全体で共有する読み取り専用のデータキャッシュ
+- Streamlit のセッション（ログイン中の人）ごとに同じ DataFrame・集計表を持たないよう、プロセスで1つだけ持つ
+  （10人が同じ投手を見ても、読み込み・メモリは1人分）
+- 値と一緒に「版」（CSV のサイズ・更新時刻など）を覚えておき、版が変わっていれば読み直す
+- 保存（入力フォーム・一括取り込み）したら、その投手の分はすぐ捨てる（invalidate）
+- 同じものを複数のセッションが同時に読みに来たら、1つだけが読み込み、ほかはその結果を待つ
+- 合計サイズが上限を超えたら、最近使っていないものから捨てる
+- 返した値は全セッションで共有するので、書き換えないこと
+
+上限（MB）は環境変数 PITCH_CACHE_MB で変更できる（既定 256）。
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CACHE_MAX_BYTES = int(os.environ.get("PITCH_CACHE_MB", "256")) * 1024 * 1024
+
+
+def estimate_size(value):
+    """値のおおよそのメモリ量（バイト）"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, str)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class SharedCache:
+    """
+    (種類, 持ち主, 引数) をキーにした LRU キャッシュ
+    - 持ち主は (データの場所, 投手名)。invalidate() で投手ごとにまとめて捨てる
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()  # key -> (version, value, nbytes)
+        self._total = 0
+        self._loading = {}           # key -> threading.Event（読み込み中）
+        self._stats = {}             # 種類 -> {"hits", "misses", "evictions"}
+        self._lock = threading.Lock()
+
+    def _count(self, kind, name):
+        counts = self._stats.setdefault(kind, {"hits": 0, "misses": 0, "evictions": 0})
+        counts[name] += 1
+
+    def get(self, kind, owner, params, version, load):
+        """
+        キャッシュした値を返す。なければ（版が違えば）load() で読み込んで覚える
+        - version は値が古くなっていないかの確認に使う（同じなら同じデータ）
+        """
+        key = (kind, owner, params)
+        while True:
+            with self._lock:
+                item = self._items.get(key)
+                if item is not None and item[0] == version:
+                    self._items.move_to_end(key)
+                    self._count(kind, "hits")
+                    return item[1]
+                waiting = self._loading.get(key)
+                if waiting is None:
+                    self._count(kind, "misses")
+                    done = self._loading[key] = threading.Event()
+                    break
+            # 他のセッションが読み込み中なら、終わるのを待ってからもう一度見る
+            waiting.wait()
+
+        try:
+            value = load()
+            self._put(key, version, value)
+            return value
+        finally:
+            with self._lock:
+                del self._loading[key]
+            done.set()
+
+    def _put(self, key, version, value):
+        nbytes = estimate_size(value)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._total -= old[2]
+            if nbytes > self.max_bytes:
+                return
+            self._items[key] = (version, value, nbytes)
+            self._total += nbytes
+            while self._total > self.max_bytes:
+                (kind, _, _), (_, _, size) = self._items.popitem(last=False)
+                self._total -= size
+                self._count(kind, "evictions")
+
+    def invalidate(self, owner):
+        """持ち主（データの場所, 投手名）の値をすべて捨てる"""
+        with self._lock:
+            for key in [key for key in self._items if key[1] == owner]:
+                self._total -= self._items.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._total = 0
+            self._stats.clear()
+
+    def stats(self):
+        """種類ごとの [種類, 件数, MB, hits, misses, hit_rate, evictions]"""
+        with self._lock:
+            entries, sizes = {}, {}
+            for (kind, _, _), (_, _, size) in self._items.items():
+                entries[kind] = entries.get(kind, 0) + 1
+                sizes[kind] = sizes.get(kind, 0) + size
+            rows = []
+            for kind in sorted(set(entries) | set(self._stats)):
+                counts = self._stats.get(kind, {"hits": 0, "misses": 0, "evictions": 0})
+                total = counts["hits"] + counts["misses"]
+                rows.append({
+                    "kind": kind,
+                    "entries": entries.get(kind, 0),
+                    "mb": round(sizes.get(kind, 0) / 1024 / 1024, 2),
+                    "hits": counts["hits"],
+                    "misses": counts["misses"],
+                    "hit_rate": round(counts["hits"] / total, 3) if total else None,
+                    "evictions": counts["evictions"],
+                })
+            return rows
+
+    def total_bytes(self):
+        with self._lock:
+            return self._total
+
+
+_cache = SharedCache(CACHE_MAX_BYTES)
+
+
+def get(kind, owner, params, version, load):
+    return _cache.get(kind, owner, params, version, load)
+
+
+def invalidate(owner):
+    _cache.invalidate(owner)
+
+
+def clear():
+    _cache.clear()
+
+
+def stats():
+    return _cache.stats()
+
+
+def show_cache_panel():
+    """サイドバーに共有キャッシュの状態を表示する（管理者だけに呼ぶこと）"""
+    import streamlit as st
+    import figure_cache
+    with st.sidebar.expander("🗄 共有キャッシュ", expanded=False):
+        st.caption(f"{_cache.total_bytes() / 1024 / 1024:.1f} / {_cache.max_bytes / 1024 / 1024:.0f} MB")
+        rows = [{"cache": "data", **row} for row in stats()] + \
+               [{"cache": "figures", **row} for row in figure_cache.stats()]
+        if rows:
+            st.dataframe(rows, hide_index=True)
+        else:
+            st.caption("まだ使われていません")
+        if st.button("キャッシュを空にする", key="shared_cache_clear"):
+            clear()
+            figure_cache.clear()
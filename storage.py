@@ -0,0 +1,483 @@
+"""
+投球データの保存先（ストレージ）
+- 入力フォーム・分析・レポートは get_storage() が返すオブジェクトを通して保存・読み込みする
+- 保存する値は正規の表記にそろえる（vocabulary.py）。読み込んだ後の整形はしない
+- csv（既定）: 投手ごとの CSV（data/<投手名>.csv）。集計表・時刻インデックス・GitHub 同期は今までどおり
+- sqlite: 全投手を1つの SQLite（data/pitches.db）に入れる
+  - WAL モードなので、複数人が同時に入力しても読み込みは待たされない
+  - 投手・日時・カウント・打者左右・球種にインデックスを張り、集計は SQL の GROUP BY で行う
+  - GitHub 同期は CSV のときだけ
+- 読み込んだ集計表・投球はプロセス全体の共有キャッシュ（shared_cache.py）に置き、全セッションで使い回す
+  - データの版（CSV のサイズ・更新時刻、SQLite の最大 id）が変わったら読み直す
+  - 保存したら、その投手の分はすぐ捨てる
+
+環境変数 PITCH_STORAGE=sqlite で SQLite を使う（csv / parquet は CSV）。
+CSV から取り込み: python storage.py import [--data-dir data] [投手名 ...]
+"""
+import argparse
+import os
+import sqlite3
+import threading
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+import shared_cache
+import time_index
+from github_sync import get_syncer
+from pitch_data import load_pitcher_data
+from pitch_log import COLUMNS, append_pitch, append_rows, format_rows, header_size
+from timing import stage
+from vocabulary import canonicalize, canonicalize_frame
+
+DATA_DIR = "data"
+DB_NAME = "pitches.db"
+BUSY_TIMEOUT = 10.0  # 他の人が書き込み中なら何秒まで待つか
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pitches (
+    id INTEGER PRIMARY KEY,
+    日時 TEXT,
+    投手名 TEXT NOT NULL,
+    球速 INTEGER,
+    球種 TEXT,
+    コース TEXT,
+    カウント TEXT,
+    打者左右 TEXT,
+    結果 TEXT,
+    モーション TEXT,
+    牽制 TEXT,
+    打球方向 TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_pitches_pitcher_time ON pitches (投手名, 日時);
+CREATE INDEX IF NOT EXISTS idx_pitches_time ON pitches (日時);
+CREATE INDEX IF NOT EXISTS idx_pitches_count ON pitches (投手名, カウント, 球種);
+CREATE INDEX IF NOT EXISTS idx_pitches_side ON pitches (投手名, 打者左右, コース);
+CREATE INDEX IF NOT EXISTS idx_pitches_direction ON pitches (投手名, 打者左右, 打球方向);
+CREATE INDEX IF NOT EXISTS idx_pitches_pitch_type ON pitches (投手名, 球種);
+CREATE INDEX IF NOT EXISTS idx_pitches_pitcher_id ON pitches (投手名, id);
+-- 投手ごとの書き換えの回数: pitches の変更・削除のたびにトリガーで増やす（どのプロセスが書いても増える）
+-- 追加は最大 id が必ず増えるので数えない（1行ごとのトリガーは一括取り込みを遅くする）
+CREATE TABLE IF NOT EXISTS pitch_revisions (
+    投手名 TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS trg_pitches_update AFTER UPDATE ON pitches BEGIN
+    INSERT INTO pitch_revisions VALUES (OLD.投手名, 1)
+        ON CONFLICT(投手名) DO UPDATE SET revision = revision + 1;
+    INSERT INTO pitch_revisions VALUES (NEW.投手名, 1)
+        ON CONFLICT(投手名) DO UPDATE SET revision = revision + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_pitches_delete AFTER DELETE ON pitches BEGIN
+    INSERT INTO pitch_revisions VALUES (OLD.投手名, 1)
+        ON CONFLICT(投手名) DO UPDATE SET revision = revision + 1;
+END;
+"""
+
+INSERT = f"INSERT INTO pitches ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+def backend_name():
+    """環境変数 PITCH_STORAGE から保存先の種類を決める"""
+    return "sqlite" if os.environ.get("PITCH_STORAGE", "csv").lower() == "sqlite" else "csv"
+
+
+def cached(storage, kind, pitcher, load, *params):
+    """
+    load() の結果を共有キャッシュ経由で返す（全セッションで同じオブジェクトを使う。書き換えないこと）
+    - storage.version(pitcher) が変わっていれば読み直す
+    """
+    return shared_cache.get(f"{storage.name}.{kind}", (storage.data_dir, pitcher), params,
+                            storage.version(pitcher), load)
+
+
+# ----------------------------
+# CSV
+# ----------------------------
+def on_pitch_saved(filepath, data, start, end, mtime_ns=None):
+    """追記した1球を集計表・時刻インデックスに反映する（CSV のロック中に呼ばれる）"""
+    with stage("input.update_aggregates"):
+        aggregates.record_pitch(filepath, data, start, end, mtime_ns)
+    with stage("input.update_time_index"):
+        time_index.record_pitch(filepath, data, start, end, mtime_ns)
+
+
+def on_pitches_saved(filepath, df, line_starts, start, end, mtime_ns=None):
+    """まとめて追記した行を集計表・時刻インデックスに反映する（一括取り込み。CSV のロック中に呼ばれる）"""
+    with stage("import.update_aggregates"):
+        aggregates.record_part(filepath, aggregates.aggregate_frame(df), start, end, mtime_ns)
+    with stage("import.update_time_index"):
+        time_index.record_rows(filepath, df["日時"], start + line_starts, start, end, mtime_ns)
+
+
+def save_to_github(filepath):
+    """
+    保存したファイルを GitHub 同期キューに追加する
+    - 実際の送信はバックグラウンドでまとめて行う（github_sync.py）
+    """
+    with stage("input.github_enqueue"):
+        syncer = get_syncer(os.path.dirname(filepath) or DATA_DIR)
+        if syncer is not None:
+            syncer.enqueue(filepath)
+
+
+class CsvStorage:
+    """投手ごとの CSV（data/<投手名>.csv）"""
+
+    name = "csv"
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+
+    def path(self, pitcher):
+        return os.path.join(self.data_dir, f"{pitcher}.csv")
+
+    def version(self, pitcher):
+        """データの版（CSV のサイズと更新時刻。ファイルがなければ None）"""
+        try:
+            st_result = os.stat(self.path(pitcher))
+        except FileNotFoundError:
+            return None
+        return (st_result.st_size, st_result.st_mtime_ns)
+
+    def pitchers(self):
+        if not os.path.isdir(self.data_dir):
+            return []
+        return sorted(os.path.splitext(f)[0] for f in os.listdir(self.data_dir) if f.endswith(".csv"))
+
+    def append_pitch(self, data):
+        """1行だけ末尾に追記する（既存ファイルは読まない。集計表にも1球分だけ足し込む）"""
+        data = canonicalize(data)
+        filepath = self.path(data["投手名"])
+        append_pitch(filepath, data, after_write=lambda *written: on_pitch_saved(filepath, data, *written))
+        shared_cache.invalidate((self.data_dir, data["投手名"]))
+        save_to_github(filepath)
+
+    def append_pitches(self, pitcher, df):
+        """
+        1人分の投球（DataFrame、値は正規の表記）をまとめて末尾に追記する（一括取り込み用）
+        - CSV への書き込み・集計表・時刻インデックスの更新はそれぞれ1回
+        """
+        filepath = self.path(pitcher)
+        lines = format_rows(df).encode("utf-8")
+        # 各行の先頭位置（値に改行は入らないので、改行の位置で区切れる）
+        ends = np.flatnonzero(np.frombuffer(lines, dtype=np.uint8) == ord("\n")) + 1
+        line_starts = np.concatenate(([0], ends[:-1]))
+        append_rows(filepath, lines,
+                    after_write=lambda *written: on_pitches_saved(filepath, df, line_starts, *written))
+        shared_cache.invalidate((self.data_dir, pitcher))
+        save_to_github(filepath)
+
+    def load_aggregates(self, pitcher, start=None, end=None):
+        """
+        集計表（日時が [start, end) の投球。どちらも None なら全期間）
+        - 全期間: 1球ごとに更新される集計表をそのまま使う（生データは読まない）
+        - 期間指定: 時刻インデックスで該当する行だけを読んで集計する
+        """
+        return cached(self, "aggregates", pitcher, lambda: self._load_aggregates(pitcher, start, end), start, end)
+
+    def _load_aggregates(self, pitcher, start, end):
+        if start is None and end is None:
+            return aggregates.load_aggregates(self.path(pitcher))
+        df = self.read_range(pitcher, start, end)
+        if df.empty or "球種" not in df.columns:
+            return aggregates.empty_aggregates()
+        return aggregates.aggregate_frame(df)
+
+    def needs_rebuild(self, pitcher):
+        return aggregates.needs_rebuild(self.path(pitcher))
+
+    def rebuild(self, pitcher):
+        return aggregates.rebuild_aggregates(self.path(pitcher))
+
+    def load_pitches(self, pitcher):
+        """全投球（キャッシュと共有しているので書き換えないこと）"""
+        return load_pitcher_data(self.path(pitcher))
+
+    def read_range(self, pitcher, start=None, end=None):
+        """日時が [start, end) の投球（整形前）"""
+        return time_index.read_range(self.path(pitcher), start, end)
+
+    def count_by(self, pitcher, columns):
+        """columns の値の組み合わせごとの投球数（columns + 件数 の DataFrame。欠損も1つの値として数える）"""
+        df = self.load_pitches(pitcher).reindex(columns=list(columns))  # 古い CSV にない列は欠損として数える
+        with stage("storage.csv.count_by"):
+            return df.groupby(list(columns), dropna=False).size().rename("件数").reset_index()
+
+    def list_sessions(self, pitcher):
+        """試合の一覧: [(開始時刻, 投球数)]（新しい順）"""
+        return cached(self, "sessions", pitcher,
+                      lambda: time_index.load_sessions(self.path(pitcher)))
+
+    def last_time(self, pitcher):
+        """最後の投球の日時（文字列。なければ None）"""
+        return cached(self, "last_time", pitcher, lambda: time_index.load_index(self.path(pitcher))["last_time"])
+
+    def tail_start(self, pitcher):
+        """最新の試合の先頭の読み込み位置（read_new に渡す。時刻順でなければファイルの先頭）"""
+        index = time_index.load_index(self.path(pitcher))
+        if index["sorted"] and index["sessions"]:
+            return index["sessions"][-1][1]
+        return header_size(self.path(pitcher))
+
+    def read_new(self, pitcher, cursor):
+        """
+        cursor（バイト位置）より後に追記された行だけを読む
+        - 書き込み途中の最後の行は読まずに次回に回す
+        戻り値: (DataFrame（全列文字列）, 次の cursor)。ファイルが書き換えられて続きが読めなければ (None, None)
+        """
+        with open(self.path(pitcher), "rb") as f:
+            header = f.readline()
+            size = os.fstat(f.fileno()).st_size
+            if cursor < len(header) or cursor > size:
+                return None, None
+            f.seek(cursor - 1)
+            if f.read(1) != b"\n":  # 行の区切りでない → ファイルが書き換えられた
+                return None, None
+            data = f.read(size - cursor)
+        end = data.rfind(b"\n") + 1
+        names = header.decode("utf-8-sig").strip().split(",")
+        if not data[:end].strip():
+            return pd.DataFrame(columns=names), cursor
+        with stage("storage.csv.read_new"):
+            df = pd.read_csv(BytesIO(data[:end]), header=None, names=names, dtype=str)
+        return df, cursor + end
+
+
+# ----------------------------
+# SQLite
+# ----------------------------
+def _db_value(value):
+    """空文字・欠損は NULL にする（CSV を pandas で読んだときの NaN と同じ扱い）"""
+    if value is None or value == "" or (isinstance(value, float) and value != value):
+        return None
+    return value
+
+
+class SqliteStorage:
+    """
+    全投手を1つの SQLite に入れる
+    - 接続はスレッドごとに1つ（Streamlit のセッションはスレッドで動く）
+    - プロセスプールに渡すときはディレクトリ名だけを送り、接続は向こうで作り直す
+    """
+
+    name = "sqlite"
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self.db_path = os.path.join(data_dir, DB_NAME)
+        self._local = threading.local()
+
+    def __getstate__(self):
+        return {"data_dir": self.data_dir}
+
+    def __setstate__(self, state):
+        self.__init__(state["data_dir"])
+
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(self.data_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def version(self, pitcher=None):
+        """
+        データの版: (書き換えの回数, 最大 id)。pitcher が None なら全投手分
+        - 追記すると最大 id が増える。変更・削除（import_csv の置き換え・vocabulary の migrate）では回数が増える
+          （削除して入れ直すと id が同じ値に戻ることがあるので、最大 id だけでは足りない）
+        - どちらもインデックスを引くだけなので、投球数によらずすぐ返る
+        """
+        conn = self.connect()
+        if pitcher is None:
+            revision = conn.execute("SELECT SUM(revision) FROM pitch_revisions").fetchone()[0]
+            return revision, conn.execute("SELECT MAX(id) FROM pitches").fetchone()[0]
+        revision = conn.execute("SELECT revision FROM pitch_revisions WHERE 投手名 = ?", (pitcher,)).fetchone()
+        last_id = conn.execute("SELECT MAX(id) FROM pitches WHERE 投手名 = ?", (pitcher,)).fetchone()[0]
+        return (revision[0] if revision else 0), last_id
+
+    def pitchers(self):
+        def load():
+            rows = self.connect().execute("SELECT DISTINCT 投手名 FROM pitches ORDER BY 投手名").fetchall()
+            return [row[0] for row in rows]
+        return cached(self, "pitchers", None, load)
+
+    def _invalidate(self, pitcher):
+        shared_cache.invalidate((self.data_dir, pitcher))
+        shared_cache.invalidate((self.data_dir, None))  # 投手の一覧
+
+    def append_pitch(self, data):
+        data = canonicalize(data)
+        values = [_db_value(data.get(column)) for column in COLUMNS]
+        conn = self.connect()
+        with conn:
+            conn.execute(INSERT, values)
+        self._invalidate(data["投手名"])
+
+    def append_pitches(self, pitcher, df):
+        """1人分の投球（DataFrame、値は正規の表記）を1つのトランザクションで追加する（一括取り込み用）"""
+        df = df.reindex(columns=COLUMNS).assign(投手名=pitcher)
+        # 空文字・欠損は NULL（_db_value と同じ）。列ごとにまとめて変換する
+        values = df.astype(object)
+        values = values.where(df.notna() & (values != ""), None)
+        conn = self.connect()
+        with conn:
+            conn.executemany(INSERT, values.itertuples(index=False, name=None))
+        self._invalidate(pitcher)
+
+    def _where(self, pitcher, start, end):
+        where, params = ["投手名 = ?"], [pitcher]
+        if start is not None:
+            where.append("日時 >= ?")
+            params.append(start.strftime(time_index.TIME_FORMAT))
+        if end is not None:
+            where.append("日時 < ?")
+            params.append(end.strftime(time_index.TIME_FORMAT))
+        return " AND ".join(where), params
+
+    def _counts(self, columns, where, params):
+        keys = ", ".join(columns)
+        sql = f"SELECT {keys}, COUNT(*) AS 件数 FROM pitches WHERE {where} GROUP BY {keys}"
+        return pd.read_sql_query(sql, self.connect(), params=params)
+
+    def load_aggregates(self, pitcher, start=None, end=None):
+        """集計表（日時が [start, end) の投球。どちらも None なら全期間）を SQL の GROUP BY で作る"""
+        return cached(self, "aggregates", pitcher, lambda: self._load_aggregates(pitcher, start, end), start, end)
+
+    def _load_aggregates(self, pitcher, start, end):
+        where, params = self._where(pitcher, start, end)
+        with stage("storage.sqlite.aggregate"):
+            rows = self.connect().execute(f"SELECT COUNT(*) FROM pitches WHERE {where}", params).fetchone()[0]
+            if not rows:
+                return aggregates.empty_aggregates()
+            by_pitch = self._counts(["球種", "カウント"], where, params)
+            by_zone = self._counts(["打者左右", "コース"], where, params)
+            by_direction = self._counts(["打者左右", "打球方向"], where, params)
+        return aggregates.aggregate_grouped(rows, by_pitch, by_zone, by_direction)
+
+    def count_by(self, pitcher, columns):
+        """columns の値の組み合わせごとの投球数（columns + 件数 の DataFrame）を SQL の GROUP BY で数える"""
+        where, params = self._where(pitcher, None, None)
+        with stage("storage.sqlite.count_by"):
+            return self._counts(columns, where, params)
+
+    def needs_rebuild(self, pitcher):
+        return False  # 集計は毎回 SQL で行うので、作り直すものはない
+
+    def rebuild(self, pitcher):
+        return self.load_aggregates(pitcher)
+
+    def read_range(self, pitcher, start=None, end=None):
+        """日時が [start, end) の投球（整形前）"""
+        where, params = self._where(pitcher, start, end)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM pitches WHERE {where} ORDER BY 日時, id"
+        with stage("storage.sqlite.read"):
+            return pd.read_sql_query(sql, self.connect(), params=params)
+
+    def load_pitches(self, pitcher):
+        """全投球（キャッシュと共有しているので書き換えないこと）"""
+        return cached(self, "pitches", pitcher, lambda: self.read_range(pitcher))
+
+    def list_sessions(self, pitcher):
+        """
+        試合の一覧: [(開始時刻, 投球数)]（新しい順）
+        - time_index と同じく、日付が変わるか GAME_GAP より空いたら別の試合
+        - 日時はインデックス順に読むだけなので、区切りの判定は pandas でまとめて行う
+        """
+        return cached(self, "sessions", pitcher, lambda: self._list_sessions(pitcher))
+
+    def _list_sessions(self, pitcher):
+        rows = self.connect().execute(
+            "SELECT 日時 FROM pitches WHERE 投手名 = ? AND 日時 IS NOT NULL ORDER BY 日時", (pitcher,)).fetchall()
+        return time_index.sessions_from_times(pd.Series([row[0] for row in rows], dtype=object))
+
+    def last_time(self, pitcher):
+        """最後の投球の日時（文字列。なければ None）"""
+        return cached(self, "last_time", pitcher, lambda: self.connect().execute(
+            "SELECT MAX(日時) FROM pitches WHERE 投手名 = ?", (pitcher,)).fetchone()[0])
+
+    def tail_start(self, pitcher):
+        """
+        最新の試合の先頭の読み込み位置（read_new に渡す）
+        - (書き換えの回数, その試合より前の、この投手の最後の id)
+        """
+        revision = self.version(pitcher)[0]
+        sessions = self.list_sessions(pitcher)
+        if not sessions:
+            return revision, 0
+        row = self.connect().execute(
+            "SELECT MAX(id) FROM pitches WHERE 投手名 = ? AND id < "
+            "(SELECT MIN(id) FROM pitches WHERE 投手名 = ? AND 日時 >= ?)",
+            (pitcher, pitcher, sessions[0][0])).fetchone()
+        return revision, row[0] or 0
+
+    def read_new(self, pitcher, cursor):
+        """
+        id が cursor より大きい行（前回より後に追加された行）だけを読む
+        戻り値: (DataFrame, 次の cursor)。前回から書き換えられていれば（取り込み直した等）(None, None)
+        """
+        revision, last_id = cursor
+        if self.version(pitcher)[0] != revision:
+            return None, None
+        sql = f"SELECT id, {', '.join(COLUMNS)} FROM pitches WHERE 投手名 = ? AND id > ? ORDER BY id"
+        with stage("storage.sqlite.read_new"):
+            df = pd.read_sql_query(sql, self.connect(), params=(pitcher, last_id))
+        if df.empty:
+            return df.drop(columns="id"), cursor
+        return df.drop(columns="id"), (revision, int(df["id"].iloc[-1]))
+
+    def import_csv(self, csv_path, pitcher=None):
+        """
+        CSV 1ファイルを取り込む（投手名はファイル名。同じ投手の既存データは置き換える）
+        - 値は正規の表記にそろえてから入れる
+        戻り値: 取り込んだ行数
+        """
+        pitcher = pitcher or os.path.splitext(os.path.basename(csv_path))[0]
+        df = pd.read_csv(csv_path, dtype=str).reindex(columns=COLUMNS)
+        df["投手名"] = pitcher
+        canonicalize_frame(df)
+        df = df.astype(object).where(df.notna(), None)
+        conn = self.connect()
+        with conn:
+            conn.execute("DELETE FROM pitches WHERE 投手名 = ?", (pitcher,))
+            conn.executemany(INSERT, ([_db_value(v) for v in row] for row in df.itertuples(index=False)))
+        self._invalidate(pitcher)
+        return len(df)
+
+
+_storages = {}
+_storages_lock = threading.Lock()
+
+
+def get_storage(data_dir=DATA_DIR):
+    """設定（PITCH_STORAGE）に応じたストレージを返す（プロセスで1つを共有する）"""
+    kind = backend_name()
+    with _storages_lock:
+        storage = _storages.get((kind, data_dir))
+        if storage is None:
+            storage = _storages[(kind, data_dir)] = (SqliteStorage if kind == "sqlite" else CsvStorage)(data_dir)
+        return storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="投球データの保存先の管理")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import", help="data/ の CSV を SQLite に取り込む（同じ投手は置き換える）")
+    p_import.add_argument("pitchers", nargs="*", help="投手名（省略すると全員）")
+    p_import.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+
+    storage = SqliteStorage(args.data_dir)
+    names = args.pitchers or CsvStorage(args.data_dir).pitchers()
+    for name in names:
+        rows = storage.import_csv(os.path.join(args.data_dir, f"{name}.csv"), pitcher=name)
+        print(f"{name}: {rows} rows")
+    print(f"-> {storage.db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+チーム全体の分析
+- 全投手の集計表を並列に読み込み、合算・投手比較を表示する
+- 集計表の作り直しが必要な投手（CSV が更新された等）はプロセスプールで並列に作り直す
+  （SQLite は毎回 SQL で集計するので作り直しはない）
+- 図は analysis.py の描画関数をそのまま使う（描画キャッシュも共通）
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import streamlit as st
+
+from aggregates import empty_aggregates, merge_aggregates
+from analysis import (
+    create_zone_matrix, count_pitch_types, count_pitch_percentages, zone_counts, direction_percentages,
+    render_zone_heatmap, render_direction, show_charts, create_pdf, FIELD_IMAGE, has_field_image,
+)
+
+# 作り直しがこの件数以上ならプロセスプールを使う（少ないと起動コストの方が大きい）
+PROCESS_POOL_MIN_FILES = 4
+
+
+def load_team_aggregates(storage, pitchers, max_workers=None):
+    """
+    全投手の集計表を並列に読み込む
+    戻り値: {投手名: 集計表}
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        stale = [name for name, flag in zip(pitchers, pool.map(storage.needs_rebuild, pitchers)) if flag]
+
+    # 作り直しは pandas の集計なので CPU を使う → プロセスで並列化
+    # （レポートと同じ spawn のプール。Streamlit のスレッドを fork するとロックを持ったまま止まることがある）
+    if len(stale) >= PROCESS_POOL_MIN_FILES and max_workers > 1:
+        from reports import get_pool
+        list(get_pool().map(storage.rebuild, stale))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip(pitchers, pool.map(storage.load_aggregates, pitchers)))
+
+
+def combine_aggregates(aggs):
+    """複数投手の集計表を合算する"""
+    total = empty_aggregates()
+    for agg in aggs:
+        merge_aggregates(total, agg)
+    return total
+
+
+def pitch_mix_table(team):
+    """投手 × 球種の割合（%）"""
+    table = pd.DataFrame({name: count_pitch_types(agg) for name, agg in team.items()}).T.fillna(0)
+    table = (table.T / table.sum(axis=1)).T * 100
+    return table.round(1).sort_index(axis=1)
+
+
+def count_tendency_table(team, count):
+    """あるカウントでの投手 × 球種の割合（%）"""
+    rows = {}
+    for name, agg in team.items():
+        if agg["count_pitch"]:
+            percent = count_pitch_percentages(agg)
+            if count in percent.index:
+                rows[name] = percent.loc[count]
+    return pd.DataFrame(rows).T.fillna(0).sort_index(axis=1)
+
+
+def show_team_analysis(storage, pitchers):
+    team = load_team_aggregates(storage, pitchers)
+    team = {name: agg for name, agg in sorted(team.items()) if agg["rows"] > 0}
+    if not team:
+        st.info("No data available yet.")
+        return
+
+    st.caption(f"{len(team)} pitchers, {sum(agg['rows'] for agg in team.values())} pitches")
+    view = st.radio("Team View", ["Combined", "Side by side"], horizontal=True)
+
+    if view == "Combined":
+        figures = show_charts(combine_aggregates(team.values()))
+        if st.button("📄 PDFを作成する", key="team_pdf"):
+            st.download_button(
+                label="📥 PDFをダウンロード",
+                data=create_pdf(figures, title="チーム投手分析レポート"),
+                file_name="team_analysis.pdf",
+                mime="application/pdf"
+            )
+        return
+
+    selected = st.multiselect("Pitchers", list(team), default=list(team))
+    if not selected:
+        return
+    team = {name: team[name] for name in selected}
+
+    # 選んだ投手のレポートをまとめて作る（プロセスプールで並列、zip でダウンロード）
+    from reports import show_report_job
+    show_report_job("team_reports", storage, selected,
+                    "📦 選んだ投手のPDFをまとめて作成", "pitcher_reports.zip")
+
+    st.title("⚾ Pitch Mix by Pitcher")
+    st.dataframe(pitch_mix_table(team).style.format("{:.1f}%"))
+
+    st.title("🎯 Count Tendencies by Pitcher")
+    counts = sorted({count for agg in team.values() for count in agg["count_pitch"]})
+    if counts:
+        count = st.selectbox("Count", counts)
+        st.dataframe(count_tendency_table(team, count).style.format("{:.1f}%"))
+
+    batter_side = st.radio("Batter", ["右", "左"], horizontal=True,
+                           format_func=lambda s: "Right-handed" if s == "右" else "Left-handed")
+    cmap = "Reds" if batter_side == "右" else "Blues"
+    # 図のタイトルは英語フォントなので、投手名は図の上に表示する
+    title = "Right-handed" if batter_side == "右" else "Left-handed"
+    per_row = st.slider("Charts per row", 2, 6, 4)
+
+    st.title("📊 Heatmaps by Pitcher")
+    names = list(team)
+    for start in range(0, len(names), per_row):
+        for col, name in zip(st.columns(per_row), names[start:start + per_row]):
+            with col:
+                st.caption(name)
+                mat = create_zone_matrix(zone_counts(team[name], batter_side), batter_side=batter_side)
+                st.image(render_zone_heatmap(mat, cmap, title), width="stretch")
+
+    st.title("🏟️ Batted Ball Direction by Pitcher")
+    if not has_field_image():
+        st.error(f"Image not found: {FIELD_IMAGE}")
+        return
+    for start in range(0, len(names), per_row):
+        for col, name in zip(st.columns(per_row), names[start:start + per_row]):
+            with col:
+                st.caption(name)
+                st.image(render_direction(direction_percentages(team[name], batter_side), title), width="stretch")
@@ -0,0 +1,160 @@
+"""
+テスト用のローカルな GitHub API（github_sync が使う Git Data API だけ）
+- リポジトリ1つ・ブランチ1つをメモリに持ち、blob / tree / commit / ref を本物と同じ形の JSON で返す
+- fail_next で次の n 回のリクエストを 500 にできる（リトライの確認用）
+- on_blob は blob を受け取るたびに呼ぶ（同期中に追記された場合の確認用）
+"""
+import base64
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OWNER, REPO, BRANCH = "team", "baseball-app", "main"
+
+
+def _sha(kind, data):
+    return hashlib.sha1(f"{kind}:{data}".encode()).hexdigest()
+
+
+class FakeGitHub:
+    def __init__(self):
+        self.blobs = {}      # sha -> 内容（文字列）
+        self.trees = {}      # sha -> {パス: blob の sha}
+        self.commits = {}    # sha -> {"message", "tree", "parents"}
+        self.requests = []   # (時刻, メソッド, パス)
+        self.fail_next = 0
+        self.on_blob = None
+        self._lock = threading.Lock()
+        root = self._add_tree({})
+        self.head = self._add_commit("initial", root, [])
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ----------------------------
+    # リポジトリの中身
+    # ----------------------------
+    def _add_tree(self, entries):
+        sha = _sha("tree", json.dumps(entries, sort_keys=True))
+        self.trees[sha] = entries
+        return sha
+
+    def _add_commit(self, message, tree, parents):
+        sha = _sha("commit", json.dumps([message, tree, parents, time.time_ns()]))
+        self.commits[sha] = {"message": message, "tree": tree, "parents": parents}
+        return sha
+
+    def files(self, commit=None):
+        """コミット（既定は HEAD）のファイル: {パス: 内容}"""
+        tree = self.trees[self.commits[commit or self.head]["tree"]]
+        return {path: self.blobs[sha] for path, sha in tree.items()}
+
+    def history(self):
+        """HEAD から古い順のコミットメッセージ（最初の空コミットは除く）"""
+        messages, sha = [], self.head
+        while self.commits[sha]["parents"]:
+            messages.append(self.commits[sha]["message"])
+            sha = self.commits[sha]["parents"][0]
+        return messages[::-1]
+
+    # ----------------------------
+    # API
+    # ----------------------------
+    def _repo_json(self):
+        url = f"{self.url}/repos/{OWNER}/{REPO}"
+        return {"id": 1, "name": REPO, "full_name": f"{OWNER}/{REPO}", "default_branch": BRANCH, "url": url}
+
+    def _commit_json(self, sha):
+        commit = self.commits[sha]
+        base = f"{self.url}/repos/{OWNER}/{REPO}/git"
+        return {"sha": sha, "url": f"{base}/commits/{sha}", "message": commit["message"],
+                "tree": {"sha": commit["tree"], "url": f"{base}/trees/{commit['tree']}"},
+                "parents": [{"sha": p, "url": f"{base}/commits/{p}"} for p in commit["parents"]]}
+
+    def _ref_json(self):
+        base = f"{self.url}/repos/{OWNER}/{REPO}/git"
+        return {"ref": f"refs/heads/{BRANCH}", "url": f"{base}/refs/heads/{BRANCH}",
+                "object": {"sha": self.head, "type": "commit", "url": f"{base}/commits/{self.head}"}}
+
+    def handle(self, method, path, body):
+        """(ステータス, JSON) を返す"""
+        git = f"/repos/{OWNER}/{REPO}/git"
+        if method == "GET" and path == f"/repos/{OWNER}/{REPO}":
+            return 200, self._repo_json()
+        if method == "GET" and path in (f"{git}/ref/heads/{BRANCH}", f"{git}/refs/heads/{BRANCH}"):
+            return 200, self._ref_json()
+        if method == "GET" and path.startswith(f"{git}/commits/"):
+            return 200, self._commit_json(path.rsplit("/", 1)[1])
+        if method == "POST" and path == f"{git}/blobs":
+            content = body["content"]
+            if body.get("encoding") == "base64":
+                content = base64.b64decode(content).decode("utf-8")
+            sha = _sha("blob", content)
+            self.blobs[sha] = content
+            if self.on_blob is not None:
+                self.on_blob(content)
+            return 201, {"sha": sha, "url": f"{self.url}{git}/blobs/{sha}"}
+        if method == "POST" and path == f"{git}/trees":
+            entries = dict(self.trees.get(body.get("base_tree"), {}))
+            for item in body["tree"]:
+                entries[item["path"]] = item["sha"]
+            sha = self._add_tree(entries)
+            return 201, {"sha": sha, "url": f"{self.url}{git}/trees/{sha}", "tree": []}
+        if method == "POST" and path == f"{git}/commits":
+            sha = self._add_commit(body["message"], body["tree"], body["parents"])
+            return 201, self._commit_json(sha)
+        if method == "PATCH" and path == f"{git}/refs/heads/{BRANCH}":
+            if self.head not in self.commits[body["sha"]]["parents"] and not body.get("force"):
+                return 422, {"message": "Update is not a fast forward"}
+            self.head = body["sha"]
+            return 200, self._ref_json()
+        return 404, {"message": "Not Found"}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                path = self.path.split("?", 1)[0]
+                with fake._lock:
+                    fake.requests.append((time.monotonic(), method, path))
+                    if fake.fail_next > 0:
+                        fake.fail_next -= 1
+                        status, payload = 500, {"message": "Server Error"}
+                    else:
+                        status, payload = fake.handle(method, path, body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def do_PATCH(self):
+                self._respond("PATCH")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,150 @@
+"""
+github_sync をローカルの偽 GitHub（fake_github.py）に対して動かすテスト
+
+使い方: python -m pytest tests
+"""
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+import pytest
+
+from fake_github import OWNER, REPO, FakeGitHub
+from github_sync import GitHubSync
+
+# 書き込みの間隔（既定 1 秒）と PyGithub 自身のリトライを切る（リトライは GitHubSync が行う）
+CLIENT_OPTIONS = {"seconds_between_requests": None, "seconds_between_writes": None, "retry": None}
+HEADER = "日時,投手名,球速,球種,コース,カウント,打者左右,結果,モーション,牽制,打球方向\n"
+
+
+@pytest.fixture
+def fake():
+    server = FakeGitHub().start()
+    yield server
+    server.stop()
+
+
+def make_syncer(fake, data_dir, interval=30.0):
+    return GitHubSync("token", repo_name=f"{OWNER}/{REPO}", data_dir=str(data_dir), interval=interval,
+                      base_url=fake.url, client_options=CLIENT_OPTIONS)
+
+
+def write_pitcher(data_dir, name, rows=1):
+    path = os.path.join(data_dir, f"{name}.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for i in range(rows):
+            f.write(f"2025-08-09 10:00:{i:02d},{name},120,ストレート,真ん中,0,右,ボール,,,なし\n")
+    return path
+
+
+def wait_for(condition, timeout=10.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_batches_pending_files_into_one_commit(fake, tmp_path):
+    syncer = make_syncer(fake, tmp_path)
+    a = write_pitcher(tmp_path, "佐藤", 2)
+    b = write_pitcher(tmp_path, "鈴木", 3)
+    syncer.enqueue(a)
+    syncer.enqueue(b)
+    syncer.enqueue(a)
+
+    assert syncer.sync_once() == 2
+    assert len(fake.history()) == 1
+    files = fake.files()
+    assert set(files) == {"data/佐藤.csv", "data/鈴木.csv"}
+    assert files["data/鈴木.csv"] == open(b, encoding="utf-8").read()
+    assert syncer.status()["pending"] == 0
+    assert syncer.sync_once() == 0  # 送るものがなければコミットしない
+    assert len(fake.history()) == 1
+
+
+def test_repo_path_does_not_depend_on_working_directory(fake, tmp_path, monkeypatch):
+    data_dir = tmp_path / "app" / "data"
+    data_dir.mkdir(parents=True)
+    path = write_pitcher(data_dir, "佐藤")
+    monkeypatch.chdir(tmp_path)  # アプリのディレクトリの外から起動した場合
+    syncer = make_syncer(fake, data_dir)
+    syncer.enqueue(path)
+    syncer.sync_once()
+    assert set(fake.files()) == {"data/佐藤.csv"}
+
+
+def test_file_appended_during_sync_stays_pending(fake, tmp_path):
+    syncer = make_syncer(fake, tmp_path)
+    path = write_pitcher(tmp_path, "佐藤")
+    syncer.enqueue(path)
+
+    def append_while_uploading(content):
+        fake.on_blob = None
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("2025-08-09 10:01:00,佐藤,125,カーブ,外角低め,1B,右,ストライク,,,なし\n")
+        syncer.enqueue(path)
+
+    fake.on_blob = append_while_uploading
+    syncer.sync_once()
+    assert syncer.status()["pending"] == 1  # 送った後に追記された分は次回に回る
+    assert "カーブ" not in fake.files()["data/佐藤.csv"]
+
+    syncer.sync_once()
+    assert syncer.status()["pending"] == 0
+    assert "カーブ" in fake.files()["data/佐藤.csv"]
+    assert len(fake.history()) == 2
+
+
+def test_retries_with_backoff_until_server_recovers(fake, tmp_path):
+    syncer = make_syncer(fake, tmp_path, interval=0.05)
+    syncer.enqueue(write_pitcher(tmp_path, "佐藤"))
+    fake.fail_next = 3
+    syncer.start()
+    try:
+        syncer.flush()
+        assert wait_for(lambda: syncer.status()["state"] == "idle")
+    finally:
+        syncer.stop(timeout=5)
+
+    assert set(fake.files()) == {"data/佐藤.csv"}
+    status = syncer.status()
+    assert status["retries"] == 0 and status["last_error"] is None
+    # 失敗した3回の間隔は、毎回長くなる（interval * 2, * 4）
+    failed = [t for t, _, _ in fake.requests[:3]]
+    gaps = [b - a for a, b in zip(failed, failed[1:])]
+    assert gaps[0] >= 0.1 * 0.9 and gaps[1] >= 0.2 * 0.9
+    assert gaps[1] > gaps[0]
+
+
+def test_failed_sync_keeps_files_pending(fake, tmp_path):
+    syncer = make_syncer(fake, tmp_path)
+    syncer.enqueue(write_pitcher(tmp_path, "佐藤"))
+    fake.fail_next = 1
+    with pytest.raises(Exception):
+        syncer.sync_once()
+    status = syncer.status()
+    assert status["pending"] == 1
+    assert status["state"] == "error"  # "syncing" のまま残らない
+    assert "500" in status["last_error"]
+    assert fake.history() == []
+
+    assert syncer.sync_once() == 1  # 手動で送り直せば元に戻る
+    assert syncer.status()["state"] == "idle" and syncer.status()["last_error"] is None
+
+
+def test_pending_files_survive_restart(fake, tmp_path):
+    path = write_pitcher(tmp_path, "佐藤")
+    make_syncer(fake, tmp_path).enqueue(path)  # 送る前にプロセスが終わった
+
+    restarted = make_syncer(fake, tmp_path)
+    assert restarted.status()["pending"] == 1
+    assert restarted.sync_once() == 1
+    assert set(fake.files()) == {"data/佐藤.csv"}
+    assert make_syncer(fake, tmp_path).status()["pending"] == 0
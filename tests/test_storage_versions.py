@@ -0,0 +1,140 @@
+"""
+ストレージの版（共有キャッシュが読み直すかどうか）のテスト
+- 別のプロセス・別の接続でデータを書き換えたら、動いているプロセスのキャッシュも読み直すこと
+
+使い方: python -m pytest tests
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+import pytest
+
+import aggregates
+import shared_cache
+import time_index
+from pitch_log import COLUMNS
+from storage import CsvStorage, SqliteStorage
+
+
+def pitch_rows(pitcher, pitch_type, n, day="2025-08-09"):
+    return pd.DataFrame({
+        "日時": [f"{day} 10:{i // 60:02d}:{i % 60:02d}" for i in range(n)],
+        "投手名": pitcher, "球速": "120", "球種": pitch_type, "コース": "真ん中", "カウント": "0",
+        "打者左右": "右", "結果": "ボール", "モーション": "", "牽制": "", "打球方向": "なし",
+    }, columns=COLUMNS)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    shared_cache.clear()
+    yield
+    shared_cache.clear()
+
+
+def test_sqlite_reimport_from_another_process_is_seen(tmp_path):
+    storage = SqliteStorage(str(tmp_path))
+    storage.append_pitches("佐藤", pitch_rows("佐藤", "ストレート", 50))
+    assert storage.load_pitches("佐藤")["球種"].unique().tolist() == ["ストレート"]
+    version = storage.version("佐藤")
+
+    # 別のプロセスから同じ行数で置き換える（id は同じ値が使い回される）
+    csv_path = tmp_path / "佐藤.csv"
+    pitch_rows("佐藤", "カーブ", 50).to_csv(csv_path, index=False)
+    code = ("import sys; sys.path.insert(0, sys.argv[1]); from storage import SqliteStorage; "
+            "SqliteStorage(sys.argv[2]).import_csv(sys.argv[3])")
+    subprocess.run([sys.executable, "-c", code, ROOT, str(tmp_path), str(csv_path)], check=True)
+
+    assert storage.version("佐藤") != version
+    assert storage.version("佐藤")[1] == version[1]  # 最大 id は変わらない
+    assert storage.load_pitches("佐藤")["球種"].unique().tolist() == ["カーブ"]
+    assert storage.load_aggregates("佐藤")["pitch_type"] == {"カーブ": 50}
+
+
+def test_sqlite_update_from_another_connection_is_seen(tmp_path):
+    storage = SqliteStorage(str(tmp_path))
+    storage.append_pitches("佐藤", pitch_rows("佐藤", "直球", 10))
+    storage.append_pitches("鈴木", pitch_rows("鈴木", "直球", 10))
+    assert storage.load_aggregates("佐藤")["pitch_type"] == {"直球": 10}
+    others = storage.version("鈴木")
+
+    # vocabulary.py migrate と同じ UPDATE（行数も id も変わらない）
+    conn = sqlite3.connect(storage.db_path)
+    with conn:
+        conn.execute("UPDATE pitches SET 球種 = 'ストレート' WHERE 投手名 = '佐藤'")
+    conn.close()
+
+    assert storage.load_aggregates("佐藤")["pitch_type"] == {"ストレート": 10}
+    assert storage.version("鈴木") == others  # 他の投手のキャッシュは捨てない
+
+
+def test_sqlite_live_cursor_resets_after_rewrite(tmp_path):
+    storage = SqliteStorage(str(tmp_path))
+    storage.append_pitches("佐藤", pitch_rows("佐藤", "ストレート", 5))
+    df, cursor = storage.read_new("佐藤", storage.tail_start("佐藤"))
+    assert len(df) == 5
+
+    conn = sqlite3.connect(storage.db_path)
+    with conn:
+        conn.execute("DELETE FROM pitches WHERE 投手名 = '佐藤'")
+    conn.close()
+    storage.append_pitches("佐藤", pitch_rows("佐藤", "カーブ", 5))  # 同じ id で入り直す
+
+    assert storage.read_new("佐藤", cursor) == (None, None)
+
+
+def rewrite_same_size(path, old, new):
+    """CSV の中身を同じバイト数のまま書き換える（更新時刻だけが変わる）"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    assert len(old.encode()) == len(new.encode())
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text.replace(old, new))
+
+
+def test_csv_aggregates_rebuilt_after_same_size_rewrite(tmp_path):
+    storage = CsvStorage(str(tmp_path))
+    storage.append_pitches("佐藤", pitch_rows("佐藤", "ストレート", 10))
+    csv_path = str(tmp_path / "佐藤.csv")
+    assert aggregates.load_aggregates(csv_path)["zone"]["右"] == {"真ん中": 10}
+
+    rewrite_same_size(csv_path, ",右,", ",左,")
+    assert aggregates.needs_rebuild(csv_path)
+    assert aggregates.load_aggregates(csv_path)["zone"]["左"] == {"真ん中": 10}
+    assert not aggregates.needs_rebuild(csv_path)
+
+
+def test_csv_append_after_same_size_rewrite_rebuilds(tmp_path):
+    storage = CsvStorage(str(tmp_path))
+    storage.append_pitches("佐藤", pitch_rows("佐藤", "ストレート", 10))
+    csv_path = str(tmp_path / "佐藤.csv")
+    rewrite_same_size(csv_path, ",右,", ",左,")
+
+    # 集計表を読む前に追記しても、書き換えた分を足し込んだまま残さない
+    storage.append_pitches("佐藤", pitch_rows("佐藤", "ストレート", 5, day="2025-08-10"))
+    assert aggregates.check_aggregates(csv_path) == []
+    assert aggregates.load_aggregates(csv_path)["zone"]["左"] == {"真ん中": 10}
+
+
+def test_csv_time_index_rebuilt_after_same_size_rewrite(tmp_path):
+    storage = CsvStorage(str(tmp_path))
+    storage.append_pitches("佐藤", pitch_rows("佐藤", "ストレート", 10))
+    csv_path = str(tmp_path / "佐藤.csv")
+    assert time_index.load_index(csv_path)["last_time"] == "2025-08-09 10:00:09"
+
+    rewrite_same_size(csv_path, "2025-08-09 10:00:09", "2025-08-12 10:00:09")
+    index = time_index.load_index(csv_path)
+    assert index["last_time"] == "2025-08-12 10:00:09"
+    assert [s[0] for s in index["sessions"]] == ["2025-08-09 10:00:00", "2025-08-12 10:00:09"]
+
+    # 書き換えた後の追記も、作り直したインデックスに足される
+    rewrite_same_size(csv_path, "2025-08-12 10:00:09", "2025-08-09 10:00:09")
+    storage.append_pitches("佐藤", pitch_rows("佐藤", "ストレート", 5, day="2025-08-10"))
+    assert time_index.load_index(csv_path) == time_index.rebuild_index(csv_path)
+    assert storage.list_sessions("佐藤") == [("2025-08-10 10:00:00", 5), ("2025-08-09 10:00:00", 10)]
@@ -0,0 +1,36 @@
+"""
+time_index（試合の区切り・期間の読み込み）のテスト
+
+使い方: python -m pytest tests
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import time_index
+from pitch_log import append_pitch
+
+TODAY = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0)
+
+
+def write_pitches(csv_path, times):
+    for t in times:
+        append_pitch(csv_path, {"日時": t.strftime(time_index.TIME_FORMAT), "投手名": "佐藤", "球速": "120",
+                                "球種": "ストレート", "コース": "真ん中", "カウント": "0", "打者左右": "右",
+                                "結果": "ボール", "モーション": "", "牽制": "", "打球方向": "なし"})
+
+
+def test_last_days_counts_back_from_today(tmp_path):
+    csv_path = str(tmp_path / "佐藤.csv")
+    write_pitches(csv_path, [TODAY - timedelta(days=60), TODAY - timedelta(days=45)])
+    # 最後の投球が 45 日前なら、直近 30 日には何もない（最後の投球から数えない）
+    assert time_index.last_days(csv_path, 30).empty
+
+    write_pitches(csv_path, [TODAY - timedelta(days=29), TODAY])
+    df = time_index.last_days(csv_path, 30)
+    assert df["日時"].tolist() == [(TODAY - timedelta(days=29)).strftime(time_index.TIME_FORMAT),
+                                   TODAY.strftime(time_index.TIME_FORMAT)]
+    assert time_index.recent_start(30) == datetime.combine((TODAY - timedelta(days=29)).date(), datetime.min.time())
@@ -0,0 +1,309 @@
+"""
+投球データの時刻インデックス
+- CSV は時刻順に追記されるので、試合（セッション）ごとの先頭バイト位置を記録しておく
+- 期間・試合で絞り込むときは、該当するバイト範囲だけを読んで解析する（ファイル全体は読まない）
+- 1球保存するたびに O(1) で更新する。CSV が外から書き換えられたら作り直す
+  （作ったときの CSV のサイズと更新時刻を覚えておき、どちらかが違えば書き換えられたとみなす）
+
+インデックスは data/index/<投手名>.json に置く。
+作り直し: python time_index.py rebuild [--data-dir data]
+"""
+import argparse
+import bisect
+import json
+import os
+from datetime import datetime, timedelta
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from pitch_log import COLUMNS, header_size, locked
+from timing import stage
+
+INDEX_DIR = "index"  # data/ の下に置く
+VERSION = 3  # 2: 時刻が戻った行では試合を区切らない 3: 更新時刻も記録する（どちらも作り直しが必要）
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# 前の投球からこれ以上空いたら別の試合とみなす（日付が変わった場合も別の試合）
+GAME_GAP = timedelta(hours=3)
+
+
+def index_path(csv_path):
+    """data/投手.csv → data/index/投手.json"""
+    data_dir, name = os.path.split(csv_path)
+    return os.path.join(data_dir, INDEX_DIR, os.path.splitext(name)[0] + ".json")
+
+
+def _parse_time(value):
+    try:
+        return datetime.strptime(value.strip(), TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+def _new_index(header_size, mtime_ns=None):
+    return {
+        "version": VERSION,
+        "source_size": header_size,  # インデックスに含めた CSV のバイト数
+        "source_mtime_ns": mtime_ns,  # そのときの CSV の更新時刻（同じサイズのまま書き換えられたかの確認用）
+        "rows": 0,
+        "sorted": True,              # 時刻順に並んでいるか（False ならバイト範囲で絞り込めない）
+        "last_time": None,
+        "sessions": [],              # [試合開始時刻, 先頭バイト位置, 先頭行番号]
+    }
+
+
+def _add_row(index, time_text, offset):
+    """1行分をインデックスに反映する"""
+    time = _parse_time(time_text)
+    if time is not None:
+        last = _parse_time(index["last_time"]) if index["last_time"] else None
+        if last is not None and time < last:
+            index["sorted"] = False
+        # 新しい試合は時刻が進んだときだけ（後から取り込んだ過去の投球では区切らない。sessions は時刻順のまま）
+        if last is None or (time > last and (time.date() != last.date() or time - last > GAME_GAP)):
+            index["sessions"].append([time.strftime(TIME_FORMAT), offset, index["rows"]])
+        if last is None or time >= last:
+            index["last_time"] = time.strftime(TIME_FORMAT)
+    index["rows"] += 1
+
+
+def _scan(csv_path):
+    """CSV を先頭から走査してインデックスを作る（日時の列だけを見る）"""
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        index = _new_index(len(header))
+        offset = len(header)
+        for line in f:
+            if line.strip():
+                _add_row(index, line.split(b",", 1)[0].decode("utf-8", "replace"), offset)
+            offset += len(line)
+        index["source_size"] = offset
+        index["source_mtime_ns"] = os.fstat(f.fileno()).st_mtime_ns
+    return index
+
+
+def save_index(csv_path, index):
+    path = index_path(csv_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read_stored(csv_path):
+    try:
+        with open(index_path(csv_path), encoding="utf-8") as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return index if index.get("version") == VERSION else None
+
+
+def _is_current(index, csv_path):
+    """インデックスが今の CSV から作られたものか（サイズも更新時刻も同じ）"""
+    st = os.stat(csv_path)
+    return index is not None and (index["source_size"], index["source_mtime_ns"]) == (st.st_size, st.st_mtime_ns)
+
+
+def _mark_appended(csv_path, index, end):
+    index["source_size"] = end
+    index["source_mtime_ns"] = os.stat(csv_path).st_mtime_ns
+    save_index(csv_path, index)
+    return index
+
+
+def rebuild_index(csv_path, lock=True):
+    """CSV からインデックスを作り直して保存する"""
+    if lock:
+        with open(csv_path, "rb") as f:
+            with locked(f):
+                index = _scan(csv_path)
+    else:
+        index = _scan(csv_path)
+    save_index(csv_path, index)
+    return index
+
+
+def record_pitch(csv_path, data, start, end, mtime_ns=None):
+    """
+    1球保存した直後にインデックスを更新する（pitch_log.append_pitch の after_write から呼ぶ）
+    - start / mtime_ns: 追記する前の CSV のサイズ・更新時刻。インデックスの記録と違えば作り直す
+    """
+    index = _read_stored(csv_path)
+    if index is None or (index["source_size"], index["source_mtime_ns"]) != (start, mtime_ns):
+        return rebuild_index(csv_path, lock=False)  # ロックは append_pitch が持っている
+    _add_row(index, str(data.get("日時") or ""), start)
+    return _mark_appended(csv_path, index, end)
+
+
+def record_rows(csv_path, times, offsets, start, end, mtime_ns=None):
+    """
+    まとめて追記した行をインデックスに反映する（一括取り込み用）
+    - times: 各行の日時（文字列の Series）、offsets: 各行の先頭バイト位置
+    - start / mtime_ns は record_pitch と同じ
+    - 1行ずつの _add_row と同じ結果になるよう、これまでの最新時刻（累積最大）と比べてまとめて判定する
+    """
+    index = _read_stored(csv_path)
+    if index is None and start == header_size(csv_path):
+        index = _new_index(start, mtime_ns)  # 新しいファイル（追記前はヘッダーだけ）なら空のインデックスから始める
+    if index is None or (index["source_size"], index["source_mtime_ns"]) != (start, mtime_ns):
+        return rebuild_index(csv_path, lock=False)  # ロックは追記する側が持っている
+    parsed = pd.to_datetime(pd.Series(times).reset_index(drop=True), format=TIME_FORMAT, errors="coerce")
+    valid = parsed.notna().to_numpy()
+    times_ok = parsed[valid]
+    offsets_ok = np.asarray(offsets)[valid]
+    rows_ok = (index["rows"] + np.arange(len(parsed)))[valid]
+    if len(times_ok):
+        first = pd.Timestamp(index["last_time"]) if index["last_time"] else pd.NaT
+        latest = times_ok.cummax()
+        if pd.notna(first):
+            latest = latest.clip(lower=first)
+        last = latest.shift()
+        last.iloc[0] = first
+        if ((times_ok < last) & last.notna()).any():
+            index["sorted"] = False
+        new = last.isna() | ((times_ok > last) & (
+            (times_ok.dt.normalize() != last.dt.normalize()) | (times_ok - last > GAME_GAP)))
+        for i in np.flatnonzero(new.to_numpy()):
+            index["sessions"].append([times_ok.iloc[i].strftime(TIME_FORMAT), int(offsets_ok[i]), int(rows_ok[i])])
+        index["last_time"] = latest.iloc[-1].strftime(TIME_FORMAT)
+    index["rows"] += len(parsed)
+    return _mark_appended(csv_path, index, end)
+
+
+def load_index(csv_path):
+    """インデックスを読む（CSV のサイズか更新時刻が変わっていれば作り直す）"""
+    index = _read_stored(csv_path)
+    if not _is_current(index, csv_path):
+        index = rebuild_index(csv_path)
+    return index
+
+
+def list_sessions(index):
+    """試合の一覧: [(開始時刻, 投球数)]（新しい順。CSV が時刻順に並んでいるときだけ正しい → load_sessions）"""
+    sessions = index["sessions"]
+    rows = [s[2] for s in sessions] + [index["rows"]]
+    return [(s[0], rows[i + 1] - s[2]) for i, s in enumerate(sessions)][::-1]
+
+
+def sessions_from_times(texts):
+    """
+    日時順に並べた日時（文字列の Series）を試合に区切る: [(開始時刻, 投球数)]（新しい順）
+    - 日付が変わるか GAME_GAP より空いたら別の試合。読めない日時は直前の試合に数える
+    - SQLite と、時刻順でない CSV の試合の一覧はこれで作る
+    """
+    if texts.empty:
+        return []
+    texts = texts.reset_index(drop=True)
+    times = pd.to_datetime(texts, format=TIME_FORMAT, errors="coerce")
+    prev = times.shift()
+    new_game = prev.isna() | (times.dt.normalize() != prev.dt.normalize()) | (times - prev > GAME_GAP)
+    new_game &= times.notna()
+    new_game.iloc[0] = True
+    starts = np.flatnonzero(new_game.to_numpy())
+    counts = np.diff(np.append(starts, len(texts)))
+    return [(texts.iloc[i], int(n)) for i, n in zip(starts, counts)][::-1]
+
+
+def load_sessions(csv_path):
+    """
+    CSV の試合の一覧: [(開始時刻, 投球数)]（新しい順）
+    - 時刻順に並んでいればインデックスから（ファイルは読まない）
+    - 過去の投球を後から取り込んだ等で時刻順でなければ、日時の列だけを読んで並べ替えて区切る（SQLite と同じ結果）
+    """
+    index = load_index(csv_path)
+    if index["sorted"]:
+        return list_sessions(index)
+    texts = pd.read_csv(csv_path, usecols=["日時"], dtype=str)["日時"].dropna()
+    return sessions_from_times(texts.sort_values(kind="stable"))
+
+
+def _read_bytes(csv_path, start, stop):
+    """CSV のバイト範囲 [start, stop) を DataFrame にする"""
+    with open(csv_path, "rb") as f:
+        header = f.readline().decode("utf-8-sig").strip().split(",")
+        f.seek(start)
+        data = f.read(stop - start if stop is not None else -1)
+    if not data.strip():
+        return pd.DataFrame(columns=header or COLUMNS)
+    with stage("time_index.parse"):
+        return pd.read_csv(BytesIO(data), header=None, names=header)
+
+
+def read_range(csv_path, start=None, end=None):
+    """
+    日時が [start, end) の投球だけを読む（start / end は datetime、None なら制限なし）
+    - 時刻順に並んでいれば、該当する試合のバイト範囲だけを読む
+    """
+    index = load_index(csv_path)
+    sessions = index["sessions"]
+    if index["sorted"] and sessions:
+        starts = [s[0] for s in sessions]
+        begin = sessions[0][1]
+        if start is not None:
+            # start を含む試合の先頭から読む
+            i = bisect.bisect_right(starts, start.strftime(TIME_FORMAT)) - 1
+            begin = sessions[max(i, 0)][1]
+        stop = None
+        if end is not None:
+            j = bisect.bisect_left(starts, end.strftime(TIME_FORMAT))
+            stop = sessions[j][1] if j < len(sessions) else None
+        df = _read_bytes(csv_path, begin, stop)
+    else:
+        df = pd.read_csv(csv_path)
+
+    times = pd.to_datetime(df["日時"], errors="coerce")
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= times >= start
+    if end is not None:
+        mask &= times < end
+    return df[mask].reset_index(drop=True)
+
+
+def read_session(csv_path, session_start):
+    """開始時刻 session_start（list_sessions の値）の試合の投球だけを読む"""
+    index = load_index(csv_path)
+    if index["sorted"]:
+        sessions = index["sessions"]
+        i = [s[0] for s in sessions].index(session_start)
+        stop = sessions[i + 1][1] if i + 1 < len(sessions) else None
+        return _read_bytes(csv_path, sessions[i][1], stop)
+    # 時刻順でなければ全体を読んで日時で絞る（次の試合の開始時刻まで）
+    starts = [s[0] for s in load_sessions(csv_path)][::-1]
+    i = starts.index(session_start)
+    end = datetime.strptime(starts[i + 1], TIME_FORMAT) if i + 1 < len(starts) else None
+    return read_range(csv_path, datetime.strptime(session_start, TIME_FORMAT), end)
+
+
+def recent_start(days):
+    """
+    今日を含む直近 days 日の始まり（days - 1 日前の 0 時）
+    - 最後の投球ではなく今日から数える（しばらく投げていなければ空になる）
+    - 日付の境目にそろえるので、画面を再実行してもキャッシュのキーが変わらない
+    """
+    return datetime.combine(datetime.now().date() - timedelta(days=days - 1), datetime.min.time())
+
+
+def last_days(csv_path, days):
+    """今日を含む直近 days 日の投球を読む"""
+    return read_range(csv_path, recent_start(days))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="投球データの時刻インデックス")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_rebuild = sub.add_parser("rebuild", help="CSV からインデックスを作り直す")
+    p_rebuild.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    for name in sorted(os.listdir(args.data_dir)):
+        if name.endswith(".csv"):
+            index = rebuild_index(os.path.join(args.data_dir, name))
+            print(f"{name}: {index['rows']} rows, {len(index['sessions'])} games, sorted={index['sorted']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+処理の段階ごとの時間計測
+- 環境変数 PITCH_TIMING=1 のときだけ計測する（オフのときは何もしない共有オブジェクトを返すだけ）
+- 直近の時間と、段階ごとの直近 WINDOW 回分の時間をメモリに持つ（管理者用のサイドバーに表示）
+- 環境変数 PITCH_TIMING_LOG にファイル名を指定すると、1回ごとに JSON Lines で追記する
+
+使い方:
+    with stage("analysis.load"):
+        ...
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+
+ENABLED = os.environ.get("PITCH_TIMING", "") not in ("", "0")
+LOG_PATH = os.environ.get("PITCH_TIMING_LOG")
+WINDOW = 100
+
+_NULL = nullcontext()
+_lock = threading.Lock()
+_samples = {}  # 段階名 → deque（ミリ秒）
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+def stage(name):
+    """段階 name の時間を計る with ブロックを返す"""
+    if not ENABLED:
+        return _NULL
+    return _Stage(name)
+
+
+def record(name, ms):
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=WINDOW)
+        samples.append(ms)
+    if LOG_PATH:
+        line = json.dumps({"time": datetime.now().isoformat(timespec="milliseconds"),
+                           "stage": name, "ms": round(ms, 3)}, ensure_ascii=False)
+        with open(LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def summary():
+    """段階ごとの [段階, 直近, 平均, p95, 回数]（ミリ秒）"""
+    with _lock:
+        items = {name: list(samples) for name, samples in _samples.items()}
+    rows = []
+    for name, values in sorted(items.items()):
+        ordered = sorted(values)
+        rows.append({
+            "stage": name,
+            "latest_ms": round(values[-1], 2),
+            "mean_ms": round(sum(values) / len(values), 2),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+            "count": len(values),
+        })
+    return rows
+
+
+def clear():
+    with _lock:
+        _samples.clear()
+
+
+def show_timing_panel():
+    """サイドバーに段階ごとの時間を表示する（管理者だけに呼ぶこと）"""
+    import streamlit as st
+    with st.sidebar.expander("⏱ 処理時間", expanded=False):
+        if not ENABLED:
+            st.caption("PITCH_TIMING=1 で起動すると計測します")
+            return
+        rows = summary()
+        if rows:
+            st.dataframe(rows, hide_index=True)
+        else:
+            st.caption("まだ計測結果がありません")
+        if LOG_PATH:
+            st.caption(f"ログ: {LOG_PATH}")
+        if st.button("リセット", key="timing_clear"):
+            clear()
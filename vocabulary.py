@@ -0,0 +1,233 @@
+"""
+投球データの選択肢（語彙）と正規化
+- 入力フォーム・保存・分析で使う選択肢はここで一元管理する
+- 保存するときに正規の表記にそろえる（分析では文字列の整形を一切しない）
+  - 前後の空白を取る（"1S " → "1S"、"72B " → "72B"、" " → ""）
+  - 全角の数字・英字は半角に（"１Ｂ" → "1B"）
+  - 別名は正式名に（"直球" → "ストレート"、"遊撃" → "ショート"）
+  - 複数選択（"," 区切り）は1つずつ変換する
+- 図に出す英語名もここで決める（matplotlib のフォントが日本語に対応していないため）
+
+既存データの変換（1回だけ）: python vocabulary.py migrate [--data-dir data]
+変換が必要な値・選択肢にない値の確認: python vocabulary.py check [--data-dir data]
+"""
+import argparse
+import csv
+import io
+import os
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+PITCH_TYPES = ["ストレート", "スライダー", "カーブ", "フォーク", "チェンジアップ", "ツーシーム", "カットボール", "シュート", "その他"]
+LOCATIONS = ["内角高め", "内角真ん中", "内角低め", "外角高め", "外角真ん中", "外角低め", "真ん中高め", "真ん中低め", "真ん中"]
+PITCH_COUNTS = ["0", "1S", "2S", "1B", "2B", "3B", "1B1S", "1B2S", "2B1S", "3B1S", "2B2S", "3B2S"]
+BATTING_SIDES = ["右", "左"]
+RESULTS = ["ストライク", "ボール", "ファール", "スイング", "見三振", "空三振", "四球", "死球",
+           "1ゴロ", "2ゴロ", "3ゴロ", "4ゴロ", "5ゴロ", "6ゴロ",
+           "1フライ", "2フライ", "3フライ", "4フライ", "5フライ", "6フライ", "7フライ", "8フライ", "9フライ",
+           "1ライナー", "2ライナー", "3ライナー", "4ライナー", "5ライナー", "6ライナー", "7ライナー", "8ライナー", "9ライナー",
+           "1ヒット", "2ヒット", "3ヒット", "4ヒット", "5ヒット", "6ヒット", "7ヒット", "8ヒット", "9ヒット",
+           "72B", "82B", "92B", "73B", "83B", "93B", "7HR", "8HR", "9HR",
+           "1バント", "2バント", "3バント", "4バント", "5バント",
+           "1E", "2E", "3E", "4E", "5E", "6E", "7E", "8E", "9E"]
+MOTIONS = ["", "クイック"]   # "" はなし
+PICKOFF = ["", "牽制"]       # "" はなし
+FIELD_ZONES = ["なし", "レフト", "左中間", "センター", "右中間", "ライト", "サード", "ショート", "セカンド", "ファースト"]
+
+# 列ごとの選択肢
+VOCABULARY = {
+    "球種": PITCH_TYPES,
+    "コース": LOCATIONS,
+    "カウント": PITCH_COUNTS,
+    "打者左右": BATTING_SIDES,
+    "結果": RESULTS,
+    "モーション": MOTIONS,
+    "牽制": PICKOFF,
+    "打球方向": FIELD_ZONES,
+}
+
+# 別名 → 正式名（古いデータ・他のツールの表記）
+ALIASES = {
+    "球種": {"直球": "ストレート", "フォーシーム": "ストレート"},
+    "打球方向": {"三塁": "サード", "遊撃": "ショート", "二塁": "セカンド", "一塁": "ファースト",
+              "3B": "サード", "SS": "ショート", "2B": "セカンド", "1B": "ファースト"},
+}
+
+# 図に出す英語名
+PITCH_TYPE_LABELS = {
+    "ストレート": "Fastball",
+    "ツーシーム": "Two-Seam",
+    "シンカー": "Sinker",
+    "カットボール": "Cutter",
+    "スライダー": "Slider",
+    "カーブ": "Curveball",
+    "フォーク": "Forkball",
+    "スプリット": "Splitter",
+    "チェンジアップ": "Changeup",
+    "シュート": "Shuuto",
+    "その他": "Other",
+}
+DIRECTION_LABELS = {
+    "レフト": "Left", "左中間": "Left Center", "センター": "Center", "右中間": "Right Center", "ライト": "Right",
+    "サード": "Third Base", "ショート": "Shortstop", "セカンド": "Second Base", "ファースト": "First Base",
+}
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def canonical_value(column, value):
+    """1つのセルの値を正規の表記にする（欠損はそのまま）"""
+    if _missing(value):
+        return value
+    aliases = ALIASES.get(column, {})
+    pieces = (piece.strip() for piece in unicodedata.normalize("NFKC", str(value)).split(","))
+    return ",".join(aliases.get(piece, piece) for piece in pieces if piece)
+
+
+def canonicalize(data):
+    """1球分の dict を正規の表記にしたコピーを返す（保存の直前に呼ぶ）"""
+    return {key: canonical_value(key, value) if key in VOCABULARY else value for key, value in data.items()}
+
+
+def map_values(series, func):
+    """
+    値ごとに func を適用する（値の種類の数だけ呼ぶ）
+    - カテゴリ型ならカテゴリだけに適用し、カテゴリ型のまま返す
+    - 欠損はそのまま
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        mapped = pd.Index([func(c) for c in series.cat.categories])
+        categories = mapped.unique()
+        codes = categories.get_indexer(mapped)
+        new_codes = np.where(series.cat.codes >= 0, codes[series.cat.codes], -1)
+        return pd.Series(pd.Categorical.from_codes(new_codes, categories=categories),
+                         index=series.index, name=series.name)
+    codes, uniques = pd.factorize(series)
+    mapped = np.array([func(u) for u in uniques] + [np.nan], dtype=object)
+    return pd.Series(mapped[codes], index=series.index, name=series.name)
+
+
+def canonicalize_frame(df):
+    """DataFrame の選択肢の列を正規の表記にする（元の DataFrame を書き換えて返す）"""
+    for column in VOCABULARY:
+        if column in df.columns:
+            df[column] = map_values(df[column], lambda v, c=column: canonical_value(c, v))
+    return df
+
+
+def _label(value, labels):
+    if _missing(value):
+        return value
+    return ",".join(labels.get(piece, piece) for piece in str(value).split(","))
+
+
+def pitch_type_label(value):
+    """球種（正規の表記）→ 図に出す英語名"""
+    return _label(value, PITCH_TYPE_LABELS)
+
+
+def direction_label(value):
+    """打球方向（正規の表記）→ 図に出す英語名"""
+    return _label(value, DIRECTION_LABELS)
+
+
+# ----------------------------
+# 既存データの変換
+# ----------------------------
+def _rewrite_rows(text):
+    """CSV の中身を正規の表記に書き換える。戻り値: (新しい中身, 変えたセル数, 選択肢にない値の集合)"""
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return text, 0, set()
+    header = rows[0]
+    targets = [(i, column) for i, column in enumerate(header) if column in VOCABULARY]
+    changed, unknown = 0, set()
+    for row in rows[1:]:
+        for i, column in targets:
+            if i >= len(row):
+                continue
+            value = canonical_value(column, row[i])
+            if value != row[i]:
+                row[i] = value
+                changed += 1
+            unknown.update((column, piece) for piece in value.split(",") if piece and piece not in VOCABULARY[column])
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    return buf.getvalue(), changed, unknown
+
+
+def migrate_csv(csv_path, dry_run=False):
+    """
+    CSV を正規の表記に書き換える
+    - 追記中の入力と混ざらないよう、ロックしたまま同じファイルを書き換える
+    戻り値: (変えたセル数, 選択肢にない値の集合)
+    """
+    from pitch_log import locked
+    with open(csv_path, "r+b") as f:
+        with locked(f):
+            f.seek(0)
+            raw = f.read()
+            bom = raw.startswith(b"\xef\xbb\xbf")
+            text, changed, unknown = _rewrite_rows(raw.decode("utf-8-sig"))
+            if changed and not dry_run:
+                f.seek(0)
+                f.write((b"\xef\xbb\xbf" if bom else b"") + text.encode("utf-8"))
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+    return changed, unknown
+
+
+def migrate_sqlite(storage, dry_run=False):
+    """SQLite の選択肢の列を正規の表記に書き換える。戻り値: (変えたセル数, 選択肢にない値の集合)"""
+    from storage import _db_value
+    conn = storage.connect()
+    changed, unknown = 0, set()
+    with conn:
+        for column, vocab in VOCABULARY.items():
+            rows = conn.execute(f"SELECT {column}, COUNT(*) FROM pitches WHERE {column} IS NOT NULL GROUP BY {column}")
+            for value, n in rows.fetchall():
+                new = canonical_value(column, value)
+                unknown.update((column, piece) for piece in new.split(",") if piece and piece not in vocab)
+                if new != value:
+                    changed += n
+                    if not dry_run:
+                        conn.execute(f"UPDATE pitches SET {column} = ? WHERE {column} = ?", (_db_value(new), value))
+    return changed, unknown
+
+
+def main():
+    parser = argparse.ArgumentParser(description="投球データの表記を正規の表記にそろえる")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in [("migrate", "既存データを書き換える（1回だけ実行すればよい）"),
+                               ("check", "書き換えが必要な値・選択肢にない値を表示する（書き換えない）")]:
+        p = sub.add_parser(command, help=help_text)
+        p.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    import aggregates
+    import time_index
+    from storage import DB_NAME, SqliteStorage
+
+    dry_run = args.command == "check"
+    targets = [os.path.join(args.data_dir, name) for name in sorted(os.listdir(args.data_dir)) if name.endswith(".csv")]
+    for csv_path in targets:
+        changed, unknown = migrate_csv(csv_path, dry_run=dry_run)
+        if changed and not dry_run:
+            # 中身が変わったので集計表・時刻インデックスも作り直す
+            aggregates.rebuild_aggregates(csv_path)
+            time_index.rebuild_index(csv_path)
+        note = f", not in vocabulary: {sorted(unknown)}" if unknown else ""
+        print(f"{os.path.basename(csv_path)}: {changed} cells{note}")
+    if os.path.exists(os.path.join(args.data_dir, DB_NAME)):
+        changed, unknown = migrate_sqlite(SqliteStorage(args.data_dir), dry_run=dry_run)
+        note = f", not in vocabulary: {sorted(unknown)}" if unknown else ""
+        print(f"{DB_NAME}: {changed} cells{note}")
+
+
+if __name__ == "__main__":
+    main()